@@ -0,0 +1,319 @@
+# app/admin/catalog.py
+
+"""Модуль, содержащий потоковый импорт и экспорт каталога пиццерии (CSV и JSONL)."""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import BATCH_CHUNK_SIZE
+from app.core.models import BatchLineError, BatchResult
+from app.db.connection import get_connection, unit_of_work
+from app.db.queries import update_pizzas_visibility_by_ingredients
+from app.db.tracing import traced
+from modules.utils import chunked, detect_format, iter_records, write_records
+
+
+def to_flag(value: Any) -> int:
+    """Преобразовать значение флага (1/0, true/false) в 1 или 0."""
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in ("1", "true", "yes"):
+            return 1
+        if normalized in ("0", "false", "no", ""):
+            return 0
+        raise ValueError(f"Некорректное значение флага: {value}")
+    return int(bool(value))
+
+
+# Таблицы каталога в порядке импорта: колонки и функции приведения типов
+CATALOG_COLUMNS: Dict[str, List[Tuple[str, Callable[[Any], Any]]]] = {
+    "pizza": [("id_pizza", int), ("name_pizza", str), ("is_visible", to_flag)],
+    "ingredient": [("id_ingredient", int), ("name_ingredient", str)],
+    "pizza_cost": [("id_pizza", int), ("cost_factor", float)],
+    "ingredient_cost": [("id_ingredient", int), ("cost", float)],
+    "ingredient_amount": [("id_ingredient", int), ("amount", int)],
+    "recipe": [("id_pizza", int), ("id_ingredient", int), ("amount", int)],
+}
+
+# Ссылочные колонки таблиц каталога: колонка -> (родительская таблица, ошибка)
+CATALOG_REFERENCES: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "pizza_cost": {"id_pizza": ("pizza", "Пицца с ID {} не найдена")},
+    "ingredient_cost": {
+        "id_ingredient": ("ingredient", "Ингредиент с ID {} не найден")
+    },
+    "ingredient_amount": {
+        "id_ingredient": ("ingredient", "Ингредиент с ID {} не найден")
+    },
+    "recipe": {
+        "id_pizza": ("pizza", "Пицца с ID {} не найдена"),
+        "id_ingredient": ("ingredient", "Ингредиент с ID {} не найден"),
+    },
+}
+
+# Какие из переданных ID есть в родительской таблице
+SQL_SELECT_EXISTING_IDS_TEMPLATE = """
+    SELECT {column}
+    FROM {table}
+    WHERE {column} IN (SELECT value FROM json_each(?));
+"""
+
+SQL_SELECT_MAX_PIZZA_ID = "SELECT COALESCE(MAX(id_pizza), 0) FROM pizza;"
+SQL_SELECT_MAX_INGREDIENT_ID = "SELECT COALESCE(MAX(id_ingredient), 0) FROM ingredient;"
+
+
+def catalog_file(directory: Path, table: str, file_format: str) -> Path:
+    """Получить путь к файлу таблицы каталога.
+
+    Args:
+        directory: Каталог с файлами
+        table: Имя таблицы
+        file_format: "csv" или "jsonl"
+
+    Returns:
+        Путь вида <directory>/<table>.<file_format>
+    """
+    return Path(directory) / f"{table}.{file_format}"
+
+
+@traced
+def export_catalog(directory: Path, file_format: str = "csv") -> Dict[str, int]:
+    """Выгрузить все таблицы каталога в файлы.
+
+    Строки читаются курсором и сразу пишутся в файл, поэтому расход памяти
+    не зависит от размера каталога. Все таблицы читаются в одной транзакции,
+    то есть из одного согласованного снимка БД.
+
+    Args:
+        directory: Каталог для файлов (создается при необходимости)
+        file_format: "csv" или "jsonl"
+
+    Returns:
+        Количество выгруженных строк по каждой таблице
+
+    Raises:
+        ValueError: Если формат не поддерживается
+        OSError: При ошибке записи файлов
+        sqlite3.Error: При ошибке работы с БД
+    """
+    detect_format(catalog_file(directory, "pizza", file_format))
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    counts = {}
+
+    try:
+        with get_connection() as conn, unit_of_work(conn, immediate=False):
+            for table, columns in CATALOG_COLUMNS.items():
+                names = [name for name, _ in columns]
+                cursor = conn.execute(
+                    f"SELECT {', '.join(names)} FROM {table} ORDER BY {names[0]}"
+                )
+                counts[table] = write_records(
+                    catalog_file(directory, table, file_format), names, cursor
+                )
+
+        return counts
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при экспорте каталога: {error}")
+
+
+@traced
+def import_catalog(
+    directory: Path, file_format: str = "csv", remap_ids: bool = True
+) -> Dict[str, BatchResult]:
+    """Загрузить таблицы каталога из файлов.
+
+    Файлы читаются потоково и записываются порциями через executemany в одной
+    транзакции. Отсутствующие файлы пропускаются, некорректные строки
+    попадают в отчет и не прерывают импорт. После загрузки видимость пицц
+    пересчитывается один раз.
+
+    При remap_ids=True к ID пицц и ингредиентов из файлов прибавляется
+    текущий максимальный ID соответствующей таблицы, поэтому каталог можно
+    загрузить поверх существующего без конфликтов; ссылки в стоимостях,
+    остатках и рецептах пересчитываются так же. Если файла пицц или
+    ингредиентов среди загружаемых нет, ссылки на них не сдвигаются и
+    указывают на уже существующие записи. При remap_ids=False ID
+    сохраняются, а совпадающие записи перезаписываются.
+
+    Строки со ссылками на пиццы или ингредиенты, которых нет ни в БД,
+    ни среди загруженных, не записываются и попадают в отчет.
+
+    Args:
+        directory: Каталог с файлами <таблица>.<формат>
+        file_format: "csv" или "jsonl"
+        remap_ids: Сдвигать ID, чтобы не пересекаться с существующими
+
+    Returns:
+        Отчет по каждой загруженной таблице
+
+    Raises:
+        ValueError: Если формат не поддерживается
+        OSError: При ошибке чтения файлов
+        sqlite3.Error: При ошибке работы с БД (импорт откатывается целиком)
+    """
+    detect_format(catalog_file(directory, "pizza", file_format))
+    results = {}
+
+    try:
+        with get_connection() as conn, unit_of_work(conn):
+            offsets = {"id_pizza": 0, "id_ingredient": 0}
+            if remap_ids:
+                # Сдвигаются только ID таблиц, которые загружаются из файлов
+                if catalog_file(directory, "pizza", file_format).exists():
+                    max_pizza_id = conn.execute(SQL_SELECT_MAX_PIZZA_ID).fetchone()
+                    offsets["id_pizza"] = max_pizza_id[0]
+                if catalog_file(directory, "ingredient", file_format).exists():
+                    max_ingredient_id = conn.execute(
+                        SQL_SELECT_MAX_INGREDIENT_ID
+                    ).fetchone()
+                    offsets["id_ingredient"] = max_ingredient_id[0]
+
+            for table, columns in CATALOG_COLUMNS.items():
+                path = catalog_file(directory, table, file_format)
+                if not path.exists():
+                    continue
+
+                results[table] = import_table(conn, table, columns, path, offsets)
+
+            update_pizzas_visibility_by_ingredients(conn=conn)
+
+        return results
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при импорте каталога: {error}")
+
+
+def import_table(
+    conn: sqlite3.Connection,
+    table: str,
+    columns: List[Tuple[str, Callable[[Any], Any]]],
+    path: Path,
+    offsets: Dict[str, int],
+) -> BatchResult:
+    """Загрузить одну таблицу каталога из файла порциями.
+
+    Перед записью порции ссылки ее строк проверяются по родительским
+    таблицам (CATALOG_REFERENCES): строки с несуществующими пиццами или
+    ингредиентами попадают в отчет, остальные записываются.
+
+    Args:
+        conn: Соединение с БД (внутри транзакции импорта)
+        table: Имя таблицы
+        columns: Колонки и функции приведения типов
+        path: Путь к файлу
+        offsets: Сдвиг ID по именам ссылочных колонок
+
+    Returns:
+        Отчет о загрузке таблицы
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    names = [name for name, _ in columns]
+    query = (
+        f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' for _ in names)})"
+    )
+    references = CATALOG_REFERENCES.get(table, {})
+    result = BatchResult()
+
+    def parsed_rows() -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        for line, record in iter_records(path):
+            result.processed += 1
+            try:
+                yield line, parse_catalog_record(record, columns, offsets)
+            except ValueError as error:
+                result.errors.append(BatchLineError(line, str(error)))
+
+    for chunk in chunked(parsed_rows(), BATCH_CHUNK_SIZE):
+        missing = find_missing_references(conn, names, references, chunk)
+        rows = []
+        for line, row in chunk:
+            error = next(
+                (
+                    references[name][1].format(row[index] - offsets.get(name, 0))
+                    for index, name in enumerate(names)
+                    if row[index] in missing.get(name, ())
+                ),
+                None,
+            )
+            if error is None:
+                rows.append(row)
+            else:
+                result.errors.append(BatchLineError(line, error))
+
+        conn.executemany(query, rows)
+        result.applied += len(rows)
+
+    return result
+
+
+def find_missing_references(
+    conn: sqlite3.Connection,
+    names: List[str],
+    references: Dict[str, Tuple[str, str]],
+    chunk: List[Tuple[int, Tuple[Any, ...]]],
+) -> Dict[str, Set[int]]:
+    """Найти ссылки порции строк на отсутствующие родительские записи.
+
+    Проверка идет по БД внутри транзакции импорта, поэтому учитываются
+    и существующие записи, и уже загруженные из файлов.
+
+    Args:
+        conn: Соединение с БД (внутри транзакции импорта)
+        names: Колонки таблицы в порядке значений строки
+        references: Ссылочные колонки таблицы
+        chunk: Порция строк (номер строки файла, значения)
+
+    Returns:
+        Отсутствующие ID по именам ссылочных колонок
+    """
+    missing = {}
+    for name, (parent, _) in references.items():
+        index = names.index(name)
+        ids = {row[index] for _, row in chunk}
+        found = conn.execute(
+            SQL_SELECT_EXISTING_IDS_TEMPLATE.format(column=name, table=parent),
+            (json.dumps(sorted(ids)),),
+        )
+        missing[name] = ids.difference(found_id for found_id, in found)
+
+    return missing
+
+
+def parse_catalog_record(
+    record: Optional[Dict[str, Any]],
+    columns: List[Tuple[str, Callable[[Any], Any]]],
+    offsets: Dict[str, int],
+) -> Tuple[Any, ...]:
+    """Привести запись файла к строке таблицы.
+
+    Args:
+        record: Запись из файла (None для неразобранной строки)
+        columns: Колонки и функции приведения типов
+        offsets: Сдвиг ID по именам ссылочных колонок
+
+    Returns:
+        Кортеж значений в порядке колонок
+
+    Raises:
+        ValueError: Если запись некорректна
+    """
+    if record is None:
+        raise ValueError("Некорректная строка")
+
+    row = []
+    for name, cast in columns:
+        if name not in record:
+            raise ValueError(f"Отсутствует поле '{name}'")
+        try:
+            value = cast(record[name])
+        except (TypeError, ValueError):
+            raise ValueError(f"Некорректное значение поля '{name}'")
+        if cast in (int, float) and value < 0:
+            raise ValueError(f"Отрицательное значение поля '{name}'")
+        row.append(value + offsets[name] if name in offsets else value)
+
+    return tuple(row)
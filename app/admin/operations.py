@@ -2,15 +2,19 @@
 
 """Модуль, содержащий операции администратора для управления пиццерией."""
 
-from typing import Set
+from pathlib import Path
+from typing import Any, Dict
 
-from app.db.connection import get_connection
+from app.core.config import BATCH_CHUNK_SIZE
+from app.db.connection import get_connection, unit_of_work
 from app.db.queries import *
-
+from app.db.tracing import traced
+from modules.utils import chunked, detect_format, iter_records
 
 # ======================== Операции с ингредиентами ========================
 
 
+@traced
 def add_ingredient(name: str, cost: float, amount: int = 0) -> int:
     """Добавить новый ингредиент в базу данных.
 
@@ -34,7 +38,7 @@ def add_ingredient(name: str, cost: float, amount: int = 0) -> int:
         raise ValueError("Количество ингредиента не может быть отрицательным")
 
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Создаем ингредиент
             ingredient_id = create_ingredient(name, conn=conn)
 
@@ -50,6 +54,7 @@ def add_ingredient(name: str, cost: float, amount: int = 0) -> int:
         raise sqlite3.Error(f"Ошибка при добавлении ингредиента: {error}")
 
 
+@traced
 def delete_ingredient(ingredient_id: int, force: bool = False) -> bool:
     """Удалить ингредиент из базы данных.
 
@@ -68,32 +73,34 @@ def delete_ingredient(ingredient_id: int, force: bool = False) -> bool:
     """
 
     try:
-        with get_connection() as conn:  # Используем только один with
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование ингредиента
             if get_ingredient_by_id(ingredient_id, conn) is None:
                 raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
             # Получаем зависимые пиццы
-            # dependent_pizzas = get_pizzas_with_ingredient(ingredient_id, conn)
-            dependent_pizzas = get_pizzas_with_ingredient(ingredient_id)
+            dependent_pizzas = get_pizzas_with_ingredient(ingredient_id, conn)
             if dependent_pizzas and not force:
                 return False
             if dependent_pizzas and force:
                 # Удаляем все зависимые пиццы
                 for pizza_id in dependent_pizzas:
                     delete_recipe_for_pizza(pizza_id, conn)
+                    conn.execute(SQL_DELETE_PIZZA_COST, (pizza_id,))
                     conn.execute(
                         SQL_DELETE_PIZZA, (pizza_id,)
                     )  # Прямой SQL вместо рекурсии
-            # Удаляем ингредиент
+            # Удаляем стоимость, остаток и сам ингредиент
+            conn.execute(SQL_DELETE_INGREDIENT_COST, (ingredient_id,))
+            conn.execute(SQL_DELETE_INGREDIENT_AMOUNT, (ingredient_id,))
             conn.execute(
                 SQL_DELETE_INGREDIENT, (ingredient_id,)
             )  # Прямой SQL вместо рекурсии
-            conn.commit()
             return True
     except sqlite3.Error as error:
         raise sqlite3.Error(f"Ошибка при удалении ингредиента: {error}")
 
 
+@traced
 def update_ingredient_cost(ingredient_id: int, new_cost: float) -> None:
     """Изменить стоимость ингредиента.
 
@@ -109,7 +116,7 @@ def update_ingredient_cost(ingredient_id: int, new_cost: float) -> None:
         raise ValueError("Стоимость ингредиента не может быть отрицательной")
 
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование ингредиента
             if get_ingredient_by_id(ingredient_id, conn) is None:
                 raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
@@ -120,6 +127,7 @@ def update_ingredient_cost(ingredient_id: int, new_cost: float) -> None:
         raise sqlite3.Error(f"Ошибка при обновлении стоимости ингредиента: {error}")
 
 
+@traced
 def add_ingredient_amount(ingredient_id: int, amount: int) -> None:
     """Пополнить запас ингредиента на складе.
 
@@ -138,7 +146,7 @@ def add_ingredient_amount(ingredient_id: int, amount: int) -> None:
         raise ValueError("Количество для добавления не может быть отрицательным")
 
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование ингредиента
             if get_ingredient_by_id(ingredient_id, conn) is None:
                 raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
@@ -151,12 +159,13 @@ def add_ingredient_amount(ingredient_id: int, amount: int) -> None:
             set_ingredient_amount(ingredient_id, new_amount, conn)
 
             # Обновляем видимость пицц
-            update_pizzas_visibility_by_ingredients(conn)
+            update_pizzas_visibility_by_ingredients([ingredient_id], conn)
 
     except sqlite3.Error as error:
         raise sqlite3.Error(f"Ошибка при пополнении запаса ингредиента: {error}")
 
 
+@traced
 def refill_all_ingredients(amount: int) -> None:
     """Пополнить запасы всех ингредиентов на складе.
 
@@ -174,26 +183,141 @@ def refill_all_ingredients(amount: int) -> None:
         raise ValueError("Количество для добавления не может быть отрицательным")
 
     try:
-        with get_connection() as conn:
-            # Получаем все ингредиенты
-            ingredients = get_all_ingredients(conn)
-
-            # Пополняем каждый ингредиент
-            for ingredient in ingredients:
-                current = get_ingredient_amount(ingredient.id_ingredient, conn)
-                new_amount = (current.amount if current else 0) + amount
-                set_ingredient_amount(ingredient.id_ingredient, new_amount, conn)
+        with get_connection() as conn, unit_of_work(conn):
+            # Пополняем все ингредиенты одним запросом
+            refill_ingredient_amounts(amount, conn)
 
-            # Обновляем видимость пицц
-            update_pizzas_visibility_by_ingredients(conn)
+            # Обновляем видимость всех пицц одним проходом
+            update_pizzas_visibility_by_ingredients(conn=conn)
 
     except sqlite3.Error as error:
         raise sqlite3.Error(f"Ошибка при пополнении всех ингредиентов: {error}")
 
 
+def parse_int_field(value: Any) -> int:
+    """Привести значение поля файла к целому числу без потери данных.
+
+    Логические значения, дробные числа и вложенные структуры не принимаются:
+    int() молча превратил бы true в 1, а 2.7 в 2.
+
+    Args:
+        value: Значение из CSV (строка) или JSONL (любой тип JSON)
+
+    Returns:
+        Целое число
+
+    Raises:
+        ValueError: Если значение не является целым числом
+    """
+    if isinstance(value, bool) or isinstance(value, (dict, list)) or value is None:
+        raise ValueError(f"Некорректное целое число: {value}")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"Некорректное целое число: {value}")
+
+    return int(value)
+
+
+def parse_restock_record(record: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    """Разобрать строку файла поставки.
+
+    Args:
+        record: Запись с полями id_ingredient и amount
+
+    Returns:
+        Кортеж (id ингредиента, количество)
+
+    Raises:
+        ValueError: Если строка некорректна
+    """
+    if record is None:
+        raise ValueError("Некорректная строка")
+
+    try:
+        ingredient_id = parse_int_field(record["id_ingredient"])
+        amount = parse_int_field(record["amount"])
+    except KeyError as error:
+        raise ValueError(f"Отсутствует поле {error}")
+    except (TypeError, ValueError):
+        raise ValueError("Некорректный ID ингредиента или количество")
+
+    if amount < 0:
+        raise ValueError("Количество для добавления не может быть отрицательным")
+
+    return ingredient_id, amount
+
+
+@traced
+def restock_from_file(path: Path) -> BatchResult:
+    """Пополнить запасы ингредиентов по файлу поставки (CSV или JSONL).
+
+    Файл читается потоково, строки применяются порциями через executemany
+    в одной транзакции. Некорректные строки и неизвестные ингредиенты
+    попадают в отчет об ошибках и не прерывают пополнение остальных.
+    Видимость пицц пересчитывается один раз в конце.
+
+    CSV должен содержать заголовок с полями id_ingredient и amount,
+    строка JSONL — объект с такими же полями.
+
+    Args:
+        path: Путь к файлу поставки
+
+    Returns:
+        Отчет о количестве обработанных и примененных строк и ошибках
+
+    Raises:
+        ValueError: Если формат файла не поддерживается
+        OSError: При ошибке чтения файла
+        sqlite3.Error: При ошибке работы с БД
+    """
+    detect_format(path)
+    result = BatchResult()
+    changed: Set[int] = set()
+
+    try:
+        with get_connection() as conn, unit_of_work(conn):
+            for chunk in chunked(iter_records(path), BATCH_CHUNK_SIZE):
+                lines = []
+                for line, record in chunk:
+                    result.processed += 1
+                    try:
+                        lines.append((line, *parse_restock_record(record)))
+                    except ValueError as error:
+                        result.errors.append(BatchLineError(line, str(error)))
+
+                # Проверяем существование ингредиентов порции одним запросом
+                existing = get_existing_ingredient_ids(
+                    (ingredient_id for _, ingredient_id, _ in lines), conn
+                )
+
+                deltas = []
+                for line, ingredient_id, amount in lines:
+                    if ingredient_id not in existing:
+                        result.errors.append(
+                            BatchLineError(
+                                line, f"Ингредиент с ID {ingredient_id} не найден"
+                            )
+                        )
+                        continue
+                    deltas.append((ingredient_id, amount))
+
+                add_ingredient_amounts(deltas, conn)
+                result.applied += len(deltas)
+                changed.update(ingredient_id for ingredient_id, _ in deltas)
+
+            # Обновляем видимость пицц один раз для всей поставки
+            update_pizzas_visibility_by_ingredients(changed, conn)
+
+        result.errors.sort(key=lambda error: error.line)
+        return result
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при пополнении запасов из файла: {error}")
+
+
 # ======================== Операции с пиццами ========================
 
 
+@traced
 def add_pizza(name: str, cost_factor: float = 1.0) -> int:
     """Добавить новую пиццу в меню.
 
@@ -215,7 +339,7 @@ def add_pizza(name: str, cost_factor: float = 1.0) -> int:
         raise ValueError("Множитель стоимости не может быть отрицательным")
 
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Создаем пиццу (по умолчанию видимая)
             pizza_id = create_pizza(name, visible=True, conn=conn)
 
@@ -228,10 +352,13 @@ def add_pizza(name: str, cost_factor: float = 1.0) -> int:
         raise sqlite3.Error(f"Ошибка при добавлении пиццы: {error}")
 
 
+@traced
 def toggle_pizza_visibility(pizza_id: int) -> None:
     """Изменить видимость пиццы в меню.
 
-    Если пицца была видима, становится невидимой и наоборот.
+    Если пицца была видима, администратор скрывает ее вручную: такая пицца
+    остается скрытой и после пополнения склада. Иначе ручное скрытие снимается,
+    и пицца становится видимой, если ингредиентов хватает хотя бы на одну порцию.
 
     Args:
         pizza_id: ID пиццы
@@ -241,19 +368,22 @@ def toggle_pizza_visibility(pizza_id: int) -> None:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование пиццы
             pizza = get_pizza_by_id(pizza_id, conn)
             if pizza is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
 
             # Меняем видимость на противоположную
-            update_pizza_visibility(pizza_id, not pizza.is_visible, conn)
+            set_pizza_hidden(pizza_id, pizza.is_visible, conn)
+            if not pizza.is_visible:
+                update_pizzas_visibility_by_pizzas([pizza_id], conn)
 
     except sqlite3.Error as error:
         raise sqlite3.Error(f"Ошибка при изменении видимости пиццы: {error}")
 
 
+@traced
 def delete_pizza(pizza_id: int) -> bool:
     """Удалить пиццу из меню.
 
@@ -271,16 +401,16 @@ def delete_pizza(pizza_id: int) -> bool:
     """
 
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование пиццы
             if get_pizza_by_id(pizza_id, conn) is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
 
             # Сначала удаляем рецепт
             delete_recipe_for_pizza(pizza_id, conn)
-            # Затем удаляем саму пиццу
+            # Затем удаляем множитель стоимости и саму пиццу
+            conn.execute(SQL_DELETE_PIZZA_COST, (pizza_id,))
             conn.execute(SQL_DELETE_PIZZA, (pizza_id,))  # Прямой SQL вместо рекурсии
-            conn.commit()
             return True
 
     except sqlite3.Error as error:
@@ -290,6 +420,7 @@ def delete_pizza(pizza_id: int) -> bool:
 # ======================== Операции с рецептами ========================
 
 
+@traced
 def add_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
     """Добавить рецепт для пиццы.
 
@@ -308,26 +439,30 @@ def add_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование пиццы
             if get_pizza_by_id(pizza_id, conn) is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
 
-            # Проверяем все ингредиенты
+            # Проверяем все ингредиенты одним запросом
             for ingredient_id, amount in ingredients:
                 if amount < 0:
                     raise ValueError(
                         "Количество ингредиента не может быть отрицательным"
                     )
-                if get_ingredient_by_id(ingredient_id, conn) is None:
+
+            existing = get_existing_ingredient_ids(
+                (ingredient_id for ingredient_id, _ in ingredients), conn
+            )
+            for ingredient_id, _ in ingredients:
+                if ingredient_id not in existing:
                     raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
 
-            # Добавляем ингредиенты в рецепт
-            for ingredient_id, amount in ingredients:
-                upsert_recipe_item(pizza_id, ingredient_id, amount, conn)
+            # Добавляем ингредиенты в рецепт одной транзакцией
+            write_recipe_items(pizza_id, ingredients, conn=conn)
 
             # Проверяем наличие ингредиентов и обновляем видимость
-            update_pizzas_visibility_by_ingredients(conn)
+            update_pizzas_visibility_by_pizzas([pizza_id], conn)
 
             return True
 
@@ -335,6 +470,7 @@ def add_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
         raise sqlite3.Error(f"Ошибка при добавлении рецепта: {error}")
 
 
+@traced
 def update_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
     """Обновить рецепт пиццы.
 
@@ -353,29 +489,30 @@ def update_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование пиццы
             if get_pizza_by_id(pizza_id, conn) is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
 
-            # Проверяем все ингредиенты
+            # Проверяем все ингредиенты одним запросом
             for ingredient_id, amount in ingredients:
                 if amount < 0:
                     raise ValueError(
                         "Количество ингредиента не может быть отрицательным"
                     )
-                if get_ingredient_by_id(ingredient_id, conn) is None:
-                    raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
 
-            # Удаляем старый рецепт
-            delete_recipe_for_pizza(pizza_id, conn)
+            existing = get_existing_ingredient_ids(
+                (ingredient_id for ingredient_id, _ in ingredients), conn
+            )
+            for ingredient_id, _ in ingredients:
+                if ingredient_id not in existing:
+                    raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
 
-            # Добавляем новые ингредиенты
-            for ingredient_id, amount in ingredients:
-                upsert_recipe_item(pizza_id, ingredient_id, amount, conn)
+            # Заменяем старый рецепт новым одной транзакцией
+            write_recipe_items(pizza_id, ingredients, replace=True, conn=conn)
 
             # Проверяем наличие ингредиентов и обновляем видимость
-            update_pizzas_visibility_by_ingredients(conn)
+            update_pizzas_visibility_by_pizzas([pizza_id], conn)
 
             return True
 
@@ -383,6 +520,7 @@ def update_recipe(pizza_id: int, ingredients: List[Tuple[int, int]]) -> bool:
         raise sqlite3.Error(f"Ошибка при обновлении рецепта: {error}")
 
 
+@traced
 def delete_recipe(pizza_id: int) -> bool:
     """Удалить рецепт пиццы.
 
@@ -400,7 +538,7 @@ def delete_recipe(pizza_id: int) -> bool:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование пиццы
             if get_pizza_by_id(pizza_id, conn) is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
@@ -417,6 +555,45 @@ def delete_recipe(pizza_id: int) -> bool:
         raise sqlite3.Error(f"Ошибка при удалении рецепта: {error}")
 
 
+# ======================== Отчеты ========================
+
+
+@traced
+def get_capacity_report() -> List[Tuple[Pizza, Optional[int]]]:
+    """Получить отчет о том, сколько каждой пиццы можно приготовить из остатков.
+
+    Returns:
+        Список кортежей (пицца, максимальное количество или None без ограничения)
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        with get_connection() as conn:
+            return get_pizza_capacities(conn)
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при построении отчета: {error}")
+
+
+@traced
+def get_stock_report() -> List[Tuple[Ingredient, int]]:
+    """Получить остатки всех ингредиентов на складе.
+
+    Returns:
+        Список кортежей (ингредиент, остаток)
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        with get_connection() as conn:
+            return get_stock_levels(conn)
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при получении остатков: {error}")
+
+
 # ======================== Служебные функции ========================
 
 
@@ -476,76 +653,3 @@ def delete_recipe(pizza_id: int) -> bool:
 #
 #     except Exception as error:
 #         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
-
-
-# def get_pizzas_with_ingredient(
-#     ingredient_id: int, conn: Optional[sqlite3.Connection] = None
-# ) -> Set[int]:
-#     """Найти все пиццы, в рецептах которых используется указанный ингредиент.
-#
-#     Args:
-#         ingredient_id: ID ингредиента
-#         conn: Соединение с базой данных. Если None или невалидное - создается новое.
-#
-#     Returns:
-#         Множество ID пицц, использующих данный ингредиент
-#
-#     Raises:
-#         sqlite3.Error: При ошибке работы с БД
-#     """
-#     try:
-#         conn, need_to_close = ensure_connection(conn)
-#
-#         try:
-#             # Получаем все рецепты
-#             all_recipes = get_all_recipes(None, conn)  # Используем новую функцию
-#
-#             # Собираем ID пицц, использующих данный ингредиент
-#             pizza_ids = {
-#                 recipe.id_pizza
-#                 for recipe in all_recipes
-#                 if recipe.id_ingredient == ingredient_id
-#             }
-#
-#             if need_to_close:
-#                 conn.close()
-#
-#             return pizza_ids
-#
-#         except sqlite3.Error as error:
-#             if need_to_close:
-#                 conn.close()
-#             raise sqlite3.Error(f"Ошибка при поиске пицц с ингредиентом: {error}")
-#
-#     except Exception as error:
-#         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
-
-
-def get_pizzas_with_ingredient(ingredient_id: int) -> Set[int]:  # Убираем параметр conn
-    """Найти все пиццы, в рецептах которых используется указанный ингредиент.
-
-    Args:
-        ingredient_id: ID ингредиента
-
-    Returns:
-        Множество ID пицц, использующих данный ингредиент
-
-    Raises:
-        sqlite3.Error: При ошибке работы с БД
-    """
-    try:
-        with get_connection() as conn:  # Используем with вместо ensure_connection
-            # Получаем все рецепты
-            all_recipes = get_all_recipes(conn)  # Передаем только conn
-
-            # Собираем ID пицц, использующих данный ингредиент
-            pizza_ids = {
-                recipe.id_pizza
-                for recipe in all_recipes
-                if recipe.id_ingredient == ingredient_id
-            }
-
-            return pizza_ids
-
-    except sqlite3.Error as error:
-        raise sqlite3.Error(f"Ошибка при поиске пицц с ингредиентом: {error}")
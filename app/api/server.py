@@ -0,0 +1,526 @@
+# app/api/server.py
+
+"""HTTP JSON API для клиентских и административных операций.
+
+Сервер построен на http.server из стандартной библиотеки: соединения
+обслуживаются пулом из API_WORKERS потоков, поддерживается keep-alive
+(HTTP/1.1), каждый ответ содержит заголовки Server-Timing и X-Response-Time
+с временем обработки запроса.
+
+Маршруты:
+    GET    /menu                              меню с ценами
+    GET    /pizzas/{id}                       состав и цена пиццы
+    POST   /orders                            заказ {"items": [{"pizza_id", "quantity"}]}
+    GET    /admin/stock                       остатки ингредиентов
+    GET    /admin/capacity                    сколько пицц можно приготовить
+    POST   /admin/ingredients                 новый ингредиент {"name", "cost", "amount"}
+    DELETE /admin/ingredients/{id}?force=1    удаление ингредиента
+    PUT    /admin/ingredients/{id}/cost       стоимость ингредиента {"cost"}
+    POST   /admin/ingredients/{id}/restock    пополнение ингредиента {"amount"}
+    POST   /admin/ingredients/restock         пополнение всех ингредиентов {"amount"}
+    GET    /metrics                           метрики в текстовом формате Prometheus
+
+Пример:
+    PIZZA_API_PORT=8080 PIZZA_API_WORKERS=16 python -m app.api.server
+"""
+
+import argparse
+import json
+import re
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from app.admin.operations import (
+    add_ingredient,
+    add_ingredient_amount,
+    delete_ingredient,
+    get_capacity_report,
+    get_stock_report,
+    refill_all_ingredients,
+    update_ingredient_cost,
+)
+from app.client.intake import get_order_intake
+from app.client.operations import get_available_pizzas, get_pizza_details, order_pizzas
+from app.core.config import (
+    API_HOST,
+    API_KEEPALIVE_TIMEOUT,
+    API_MAX_BODY,
+    API_PORT,
+    API_WORKERS,
+    ORDER_INTAKE_ENABLED,
+)
+from app.core.metrics import (
+    CONTENT_TYPE,
+    HTTP_REQUEST_LATENCY,
+    REGISTRY,
+    setup_app_metrics,
+)
+from app.db.connection import get_connection
+from app.db.journal import get_order_journal
+from app.db.schema import migrate
+from app.db.tracing import get_tracer, report_sql_stats
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+# Обработчик маршрута: (параметры пути, параметры запроса, тело) -> (код, ответ)
+Handler = Callable[[Tuple[str, ...], Dict[str, List[str]], Any], Tuple[int, Any]]
+
+
+class ApiError(Exception):
+    """Ошибка запроса с HTTP-кодом ответа."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class TextResponse(str):
+    """Ответ обработчика, отдаваемый как текст, а не JSON."""
+
+
+# ======================== Разбор запроса ========================
+
+
+def parse_id(value: str) -> int:
+    """Разобрать идентификатор из пути запроса.
+
+    Args:
+        value: Фрагмент пути
+
+    Returns:
+        Идентификатор
+
+    Raises:
+        ApiError: Если идентификатор некорректен
+    """
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Некорректный идентификатор: {value}")
+
+
+def require_field(body: Any, name: str, cast: Callable[[Any], Any]) -> Any:
+    """Получить обязательное поле из JSON-тела запроса.
+
+    Args:
+        body: Разобранное тело запроса
+        name: Имя поля
+        cast: Функция приведения значения (int, float, str)
+
+    Returns:
+        Значение поля после приведения
+
+    Raises:
+        ApiError: Если поле отсутствует или имеет некорректный тип
+    """
+    if not isinstance(body, dict) or name not in body:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Не указано поле {name}")
+
+    value = body[name]
+    if isinstance(value, bool) or isinstance(value, (dict, list)) or value is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Некорректное значение поля {name}")
+    if cast is int and isinstance(value, float) and not value.is_integer():
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Некорректное значение поля {name}")
+
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Некорректное значение поля {name}")
+
+
+def query_flag(query: Dict[str, List[str]], name: str) -> bool:
+    """Получить логический параметр строки запроса (?force=1)."""
+    values = query.get(name)
+    return bool(values) and values[-1].strip().lower() in ("1", "true", "yes", "on")
+
+
+# ======================== Клиентские маршруты ========================
+
+
+def menu_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Меню: видимые пиццы с ценами."""
+    menu = [
+        {**asdict(pizza), "price": price} for pizza, price in get_available_pizzas()
+    ]
+    return HTTPStatus.OK, menu
+
+
+def pizza_details_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Состав и цена пиццы."""
+    try:
+        pizza, ingredients, price = get_pizza_details(parse_id(params[0]))
+    except ValueError as error:
+        raise ApiError(HTTPStatus.NOT_FOUND, str(error))
+
+    return HTTPStatus.OK, {
+        **asdict(pizza),
+        "price": price,
+        "ingredients": [
+            {**asdict(ingredient), "amount": amount}
+            for ingredient, amount in ingredients
+        ],
+    }
+
+
+def order_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Заказ нескольких пицц одной транзакцией (через очередь приема заказов)."""
+    items = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Не указаны позиции заказа (items)")
+
+    lines = [
+        (require_field(item, "pizza_id", int), require_field(item, "quantity", int))
+        for item in items
+    ]
+    if ORDER_INTAKE_ENABLED:
+        # Заказы всех рабочих потоков оформляются пачками одним пишущим потоком
+        results = get_order_intake().order(lines)
+    else:
+        results = order_pizzas(lines)
+
+    results = [asdict(result) for result in results]
+    return HTTPStatus.OK, {
+        "accepted": sum(1 for result in results if result["success"]),
+        "results": results,
+    }
+
+
+# ======================== Административные маршруты ========================
+
+
+def stock_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Остатки всех ингредиентов."""
+    stock = [
+        {**asdict(ingredient), "amount": amount}
+        for ingredient, amount in get_stock_report()
+    ]
+    return HTTPStatus.OK, stock
+
+
+def capacity_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Сколько каждой пиццы можно приготовить из остатков."""
+    capacity = [
+        {**asdict(pizza), "capacity": capacity}
+        for pizza, capacity in get_capacity_report()
+    ]
+    return HTTPStatus.OK, capacity
+
+
+def add_ingredient_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Добавление ингредиента."""
+    name = require_field(body, "name", str).strip()
+    if not name:
+        raise ApiError(
+            HTTPStatus.BAD_REQUEST, "Название ингредиента не может быть пустым"
+        )
+
+    cost = require_field(body, "cost", float)
+    amount = require_field(body, "amount", int) if "amount" in body else 0
+
+    return HTTPStatus.CREATED, {"id_ingredient": add_ingredient(name, cost, amount)}
+
+
+def delete_ingredient_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Удаление ингредиента (с зависимыми пиццами при force=1)."""
+    if not delete_ingredient(parse_id(params[0]), query_flag(query, "force")):
+        raise ApiError(
+            HTTPStatus.CONFLICT,
+            "Ингредиент используется в рецептах, для удаления укажите force=1",
+        )
+    return HTTPStatus.OK, {"deleted": True}
+
+
+def ingredient_cost_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Изменение стоимости ингредиента."""
+    update_ingredient_cost(parse_id(params[0]), require_field(body, "cost", float))
+    return HTTPStatus.OK, {"updated": True}
+
+
+def restock_ingredient_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Пополнение запаса ингредиента."""
+    add_ingredient_amount(parse_id(params[0]), require_field(body, "amount", int))
+    return HTTPStatus.OK, {"updated": True}
+
+
+def restock_all_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Пополнение запасов всех ингредиентов."""
+    refill_all_ingredients(require_field(body, "amount", int))
+    return HTTPStatus.OK, {"updated": True}
+
+
+def metrics_route(
+    params: Tuple[str, ...], query: Dict[str, List[str]], body: Any
+) -> Tuple[int, Any]:
+    """Метрики приложения в текстовом формате Prometheus."""
+    return HTTPStatus.OK, TextResponse(REGISTRY.render())
+
+
+# ======================== Маршрутизация ========================
+
+
+def compile_route(template: str) -> Pattern[str]:
+    """Преобразовать шаблон пути вида /pizzas/{id} в регулярное выражение."""
+    return re.compile("^" + re.sub(r"\{\w+\}", r"([^/]+)", template) + "$")
+
+
+# (метод, шаблон пути, обработчик); шаблон пути - метка маршрута в метриках
+ROUTES: List[Tuple[str, str, Handler]] = [
+    ("GET", "/menu", menu_route),
+    ("GET", "/pizzas/{id}", pizza_details_route),
+    ("POST", "/orders", order_route),
+    ("GET", "/admin/stock", stock_route),
+    ("GET", "/admin/capacity", capacity_route),
+    ("POST", "/admin/ingredients", add_ingredient_route),
+    ("POST", "/admin/ingredients/restock", restock_all_route),
+    ("DELETE", "/admin/ingredients/{id}", delete_ingredient_route),
+    ("PUT", "/admin/ingredients/{id}/cost", ingredient_cost_route),
+    ("POST", "/admin/ingredients/{id}/restock", restock_ingredient_route),
+    ("GET", "/metrics", metrics_route),
+]
+
+_COMPILED_ROUTES = [
+    (method, template, compile_route(template), handler)
+    for method, template, handler in ROUTES
+]
+
+
+def resolve_route(
+    method: str, path: str
+) -> Tuple[str, Optional[Handler], Tuple[str, ...]]:
+    """Найти обработчик запроса.
+
+    Args:
+        method: HTTP-метод
+        path: Путь запроса без строки параметров
+
+    Returns:
+        Кортеж (шаблон маршрута, обработчик, параметры пути)
+
+    Raises:
+        ApiError: Если маршрут не найден (404) или метод не поддерживается (405)
+    """
+    path_matched = None
+    for route_method, template, pattern, handler in _COMPILED_ROUTES:
+        match = pattern.match(path)
+        if match is None:
+            continue
+        if route_method == method:
+            return template, handler, match.groups()
+        path_matched = template
+
+    if path_matched is not None:
+        raise ApiError(
+            HTTPStatus.METHOD_NOT_ALLOWED, f"Метод {method} не поддерживается"
+        )
+    raise ApiError(HTTPStatus.NOT_FOUND, f"Маршрут {path} не найден")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов HTTP API.
+
+    Соединение HTTP/1.1 остается открытым между запросами (keep-alive), пока
+    клиент не попросит его закрыть или не простоит API_KEEPALIVE_TIMEOUT
+    секунд без запросов.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = API_KEEPALIVE_TIMEOUT
+    server_version = "PizzaAPI/1.0"
+    # Заголовки и тело пишутся отдельно: без TCP_NODELAY ответ ждет
+    # подтверждения клиента (алгоритм Нейгла и отложенный ACK, ~40 мс)
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.handle_api_request()
+
+    def do_POST(self) -> None:
+        self.handle_api_request()
+
+    def do_PUT(self) -> None:
+        self.handle_api_request()
+
+    def do_DELETE(self) -> None:
+        self.handle_api_request()
+
+    def read_body(self) -> Any:
+        """Прочитать и разобрать JSON-тело запроса.
+
+        Returns:
+            Разобранное тело или None, если тела нет
+
+        Raises:
+            ApiError: Если тело слишком большое или не является JSON
+        """
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length")
+
+        if length > API_MAX_BODY:
+            # Непрочитанное тело нельзя пропустить, поэтому соединение закрывается
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большое тело")
+        if length <= 0:
+            return None
+
+        raw = self.rfile.read(length)
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Тело запроса не является JSON")
+
+    def handle_api_request(self) -> None:
+        """Выполнить запрос и отправить ответ с заголовками времени обработки."""
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        route = "unmatched"
+
+        try:
+            body = self.read_body()
+            route, handler, params = resolve_route(self.command, url.path)
+            status, payload = handler(params, parse_qs(url.query), body)
+        except ApiError as error:
+            status, payload = error.status, {"error": str(error)}
+        except ValueError as error:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except TimeoutError as error:
+            status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(error)}
+        except Exception as error:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+
+        self.send_payload(int(status), payload, started)
+        HTTP_REQUEST_LATENCY.labels(self.command, route, int(status)).observe(
+            time.perf_counter() - started
+        )
+
+    def send_payload(self, status: int, payload: Any, started: float) -> None:
+        """Отправить ответ в формате JSON (или текст для TextResponse)."""
+        if isinstance(payload, TextResponse):
+            content_type, body = CONTENT_TYPE, payload.encode("utf-8")
+        else:
+            content_type = JSON_CONTENT_TYPE
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Server-Timing", f"app;dur={elapsed_ms:.3f}")
+        self.send_header("X-Response-Time", f"{elapsed_ms:.3f}ms")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Журнал каждого запроса заметно снижает пропускную способность
+        pass
+
+
+# ======================== Сервер ========================
+
+
+class ApiServer(HTTPServer):
+    """HTTP-сервер с пулом из фиксированного числа рабочих потоков.
+
+    Каждое принятое соединение обслуживается одним потоком пула до закрытия,
+    поэтому число потоков ограничивает число одновременно обслуживаемых
+    соединений; остальные ждут в очереди пула. Простаивающие keep-alive
+    соединения закрываются по таймауту и освобождают поток.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        workers: int = API_WORKERS,
+        handler: type = ApiRequestHandler,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Число рабочих потоков должно быть положительным")
+
+        super().__init__(address, handler)
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request: socket.socket, client_address: Any) -> None:
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request: socket.socket, client_address: Any) -> None:
+        """Обслужить соединение в потоке пула."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main() -> None:
+    """Запустить HTTP API до прерывания с клавиатуры."""
+    parser = argparse.ArgumentParser(description="HTTP JSON API пиццерии")
+    parser.add_argument("--host", default=API_HOST, help="Адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Порт")
+    parser.add_argument(
+        "--workers", type=int, default=API_WORKERS, help="Число рабочих потоков"
+    )
+    args = parser.parse_args()
+
+    # Метрики /metrics подключаются до открытия соединений с БД
+    setup_app_metrics()
+
+    # Доводим схему базы данных до актуальной версии
+    with get_connection() as conn:
+        migrate(conn)
+
+    server = ApiServer((args.host, args.port), args.workers)
+    print(f"HTTP API: http://{args.host}:{server.server_port} ({args.workers} потоков)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nОстановка сервера")
+    finally:
+        server.server_close()
+        get_order_intake().close()
+        get_order_journal().close()
+
+        if get_tracer().enabled:
+            print(f"\nСтатистика SQL:\n{report_sql_stats()}")
+
+
+if __name__ == "__main__":
+    main()
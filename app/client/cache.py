@@ -0,0 +1,117 @@
+# app/client/cache.py
+
+"""Модуль, содержащий кэш меню для клиентских операций."""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
+from app.core.config import MENU_CACHE_MAX_SIZE
+from app.db.queries import get_catalog_version
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    """Статистика работы кэша."""
+
+    hits: int
+    misses: int
+    size: int
+    version: Optional[int]
+
+    def __str__(self) -> str:
+        return (
+            f"Кэш меню: попаданий {self.hits}, промахов {self.misses}, "
+            f"записей {self.size}, версия каталога {self.version}"
+        )
+
+
+class MenuCache:
+    """Кэш меню, состава и цен пицц, привязанный к версии каталога.
+
+    Перед каждым чтением сверяет сохраненную версию с номером из таблицы
+    catalog_version (одно чтение по первичному ключу). Если каталог изменился
+    (в этом или любом другом процессе), кэш целиком сбрасывается.
+    Число записей ограничено, при переполнении вытесняются самые старые.
+    """
+
+    def __init__(self, max_size: int = MENU_CACHE_MAX_SIZE) -> None:
+        if max_size < 1:
+            raise ValueError("Размер кэша должен быть положительным")
+
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], T], conn: sqlite3.Connection
+    ) -> T:
+        """Получить значение из кэша или загрузить его.
+
+        Args:
+            key: Ключ записи
+            loader: Функция загрузки значения из БД
+            conn: Соединение для проверки версии каталога
+
+        Returns:
+            Закэшированное или только что загруженное значение
+
+        Raises:
+            sqlite3.Error: При ошибке работы с БД
+        """
+        version = get_catalog_version(conn)
+
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            self._misses += 1
+
+        value = loader()
+
+        with self._lock:
+            # Пока шла загрузка, каталог мог смениться — такое значение не сохраняем
+            if version == self._version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self) -> None:
+        """Сбросить кэш и статистику."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> CacheStats:
+        """Получить статистику кэша."""
+        with self._lock:
+            return CacheStats(
+                self._hits, self._misses, len(self._entries), self._version
+            )
+
+
+_cache = MenuCache()
+
+
+def get_menu_cache() -> MenuCache:
+    """Получить общий кэш меню приложения."""
+    return _cache
@@ -0,0 +1,245 @@
+# app/client/intake.py
+
+"""Модуль приема заказов с единственным пишущим потоком и групповой фиксацией."""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterator, List, Optional, Tuple
+
+from app.client.operations import order_batch
+from app.core.config import (
+    ORDER_INTAKE_BATCH_SIZE,
+    ORDER_INTAKE_MAX_WAIT,
+    ORDER_INTAKE_PUT_TIMEOUT,
+    ORDER_INTAKE_QUEUE_SIZE,
+)
+from app.core.metrics import (
+    ORDER_INTAKE_BATCH,
+    ORDER_INTAKE_QUEUE,
+    ORDERS_REJECTED,
+    Sample,
+)
+from app.core.models import OrderLineResult
+
+# Метка конца работы для пишущего потока
+_STOP = object()
+
+# Заказ в очереди: строки заказа и будущий результат
+_Pending = Tuple[List[Tuple[int, int]], "Future[List[OrderLineResult]]"]
+
+
+class OrderIntake:
+    """Прием заказов из многих потоков с записью одним пишущим потоком.
+
+    SQLite допускает только одного пишущего, поэтому параллельные заказы
+    в отдельных транзакциях ждут друг друга на блокировке БД. Здесь заказы
+    складываются в очередь, а пишущий поток забирает их пачками (до batch_size
+    штук или не дольше max_wait секунд после первого заказа) и оформляет каждую
+    пачку одной транзакцией через order_batch. Если транзакция пачки не
+    удалась, заказы пачки повторяются по одному, чтобы ошибка одного заказа
+    не отклоняла остальные. Результат каждого заказа возвращается через
+    Future: список результатов по строкам или исключение sqlite3.Error,
+    если не удалась транзакция самого заказа.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = ORDER_INTAKE_QUEUE_SIZE,
+        batch_size: int = ORDER_INTAKE_BATCH_SIZE,
+        max_wait: float = ORDER_INTAKE_MAX_WAIT,
+        put_timeout: float = ORDER_INTAKE_PUT_TIMEOUT,
+    ) -> None:
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("Размер очереди и пачки заказов должен быть положительным")
+
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.put_timeout = put_timeout
+
+        self._queue: "queue.Queue[object]" = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Число вызовов submit, которые уже проверили _closed и кладут заказ
+        self._putting = 0
+
+    @property
+    def pending(self) -> int:
+        """Число заказов, ожидающих оформления."""
+        return self._queue.qsize()
+
+    def _ensure_started(self) -> None:
+        """Запустить пишущий поток при первом заказе."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="order-intake", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, items: List[Tuple[int, int]]) -> "Future[List[OrderLineResult]]":
+        """Поставить заказ в очередь на оформление.
+
+        Args:
+            items: Строки заказа (ID пиццы, количество)
+
+        Returns:
+            Future с результатами по строкам заказа в исходном порядке
+
+        Raises:
+            RuntimeError: Если прием заказов остановлен
+            TimeoutError: Если очередь заполнена дольше put_timeout секунд
+        """
+        # Проверка и постановка в очередь атомарны относительно close():
+        # метка остановки ставится только после завершения начатых submit
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Прием заказов остановлен")
+            self._putting += 1
+
+        future: "Future[List[OrderLineResult]]" = Future()
+        try:
+            self._ensure_started()
+            self._queue.put((list(items), future), timeout=self.put_timeout)
+        except queue.Full:
+            ORDERS_REJECTED.labels("queue_full").inc(len(items))
+            raise TimeoutError("Очередь заказов переполнена")
+        finally:
+            with self._lock:
+                self._putting -= 1
+                if not self._putting:
+                    self._idle.notify_all()
+
+        return future
+
+    def order(
+        self, items: List[Tuple[int, int]], timeout: Optional[float] = None
+    ) -> List[OrderLineResult]:
+        """Оформить заказ через очередь и дождаться результата.
+
+        Args:
+            items: Строки заказа (ID пиццы, количество)
+            timeout: Сколько секунд ждать результата (None - без ограничения)
+
+        Returns:
+            Результаты по строкам заказа в исходном порядке
+
+        Raises:
+            RuntimeError: Если прием заказов остановлен
+            TimeoutError: Если очередь переполнена или результат не получен вовремя
+            sqlite3.Error: При ошибке работы с БД
+        """
+        return self.submit(items).result(timeout)
+
+    def _next_batch(self) -> Tuple[List[_Pending], bool]:
+        """Дождаться заказов и собрать пачку.
+
+        Returns:
+            Кортеж (пачка, получен ли сигнал остановки)
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _apply(self, batch: List[_Pending]) -> None:
+        """Оформить пачку одной транзакцией и передать результаты заказам."""
+        # Заказы, отмененные до начала оформления, в транзакцию не попадают
+        batch = [
+            (items, future)
+            for items, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+
+        ORDER_INTAKE_BATCH.observe(len(batch))
+        try:
+            batch_results = order_batch(
+                [items for items, _ in batch], count_errors=len(batch) == 1
+            )
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+                return
+            # Ошибка пачки не должна отклонять чужие заказы: повторяем каждый
+            # заказ отдельной транзакцией, исключение получают только упавшие
+            for items, future in batch:
+                try:
+                    future.set_result(order_batch([items])[0])
+                except Exception as order_error:
+                    future.set_exception(order_error)
+            return
+
+        for (_, future), results in zip(batch, batch_results):
+            future.set_result(results)
+
+    def _run(self) -> None:
+        """Цикл пишущего потока."""
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._apply(batch)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Дождаться оформления всех поставленных в очередь заказов."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Оформить оставшиеся заказы и остановить пишущий поток.
+
+        После закрытия новые заказы не принимаются.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._idle.wait_for(lambda: not self._putting)
+            thread = self._thread
+
+        # Все принятые заказы стоят в очереди перед меткой остановки
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+
+_intake = OrderIntake()
+
+
+def _intake_queue_size() -> Iterator[Sample]:
+    """Размер очереди приема заказов для метрики pizza_order_intake_queue."""
+    yield (), _intake.pending
+
+
+ORDER_INTAKE_QUEUE.collector = _intake_queue_size
+
+
+def get_order_intake() -> OrderIntake:
+    """Получить общую очередь приема заказов приложения."""
+    return _intake
@@ -2,13 +2,31 @@
 
 """Модуль, содержащий операции клиента для работы с пиццерией."""
 
-from app.db.connection import get_connection
+from app.client.cache import get_menu_cache
+from app.core.metrics import ORDERS_PLACED, ORDERS_REJECTED, OPERATION_LATENCY, timed
+from app.db.connection import get_connection, get_read_connection, unit_of_work
+from app.db.journal import get_order_journal
 from app.db.queries import *
+from app.db.tracing import traced
 
+# Причины отклонения строк заказа (текст ошибки -> метка метрики)
+ERROR_INVALID_QUANTITY = "Некорректное количество"
+ERROR_UNAVAILABLE = "Пицца не найдена или недоступна"
+ERROR_OUT_OF_STOCK = "Недостаточно ингредиентов"
+REJECT_REASONS = {
+    ERROR_INVALID_QUANTITY: "invalid_quantity",
+    ERROR_UNAVAILABLE: "unavailable",
+    ERROR_OUT_OF_STOCK: "out_of_stock",
+}
 
+
+@traced
+@timed(OPERATION_LATENCY)
 def get_available_pizzas() -> List[Tuple[Pizza, float]]:
     """Получить список доступных пицц с ценами.
 
+    Результат берется из кэша меню, пока каталог не изменился.
+
     Returns:
         Список кортежей (пицца, цена)
 
@@ -16,26 +34,24 @@ def get_available_pizzas() -> List[Tuple[Pizza, float]]:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
-            pizzas = get_all_pizzas(conn)  # Получаем только видимые пиццы
-            result = []
-
-            for pizza in pizzas:
-                price = get_pizza_cost(pizza.id_pizza, conn)
-                if price is not None:  # Пропускаем пиццы без цены
-                    result.append((pizza, price))
-
-            return result
+        with get_read_connection() as conn:
+            # Видимые пиццы и их цены одним агрегирующим запросом (через кэш)
+            menu = get_menu_cache().get_or_load(("menu",), lambda: get_menu(conn), conn)
+            return list(menu)
 
     except sqlite3.Error as error:
         raise sqlite3.Error(f"Ошибка при получении списка пицц: {error}")
 
 
+@traced
+@timed(OPERATION_LATENCY)
 def get_pizza_details(
     pizza_id: int,
 ) -> Tuple[Pizza, List[Tuple[Ingredient, int]], float]:
     """Получить детальную информацию о пицце.
 
+    Результат берется из кэша меню, пока каталог не изменился.
+
     Args:
         pizza_id: ID пиццы
 
@@ -47,33 +63,47 @@ def get_pizza_details(
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
-            # Получаем пиццу
-            pizza = get_pizza_by_id(pizza_id, conn)
-            if pizza is None or not pizza.is_visible:
-                raise ValueError(f"Пицца не найдена или недоступна")
+        with get_read_connection() as conn:
+            return get_menu_cache().get_or_load(
+                ("details", pizza_id), lambda: load_pizza_details(pizza_id, conn), conn
+            )
 
-            # Получаем рецепт
-            recipe = get_recipe_for_pizza(pizza_id, conn)
-            ingredients = []
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка при получении информации о пицце: {error}")
 
-            # Получаем информацию об ингредиентах
-            for item in recipe:
-                ingredient = get_ingredient_by_id(item.id_ingredient, conn)
-                if ingredient:
-                    ingredients.append((ingredient, item.amount))
 
-            # Получаем цену
-            price = get_pizza_cost(pizza_id, conn)
-            if price is None:
-                raise ValueError("Невозможно рассчитать стоимость пиццы")
+def load_pizza_details(
+    pizza_id: int, conn: sqlite3.Connection
+) -> Tuple[Pizza, List[Tuple[Ingredient, int]], float]:
+    """Загрузить из БД детальную информацию о пицце (без кэша).
 
-            return pizza, ingredients, price
+    Пицца, состав и цена читаются одним запросом.
 
-    except sqlite3.Error as error:
-        raise sqlite3.Error(f"Ошибка при получении информации о пицце: {error}")
+    Args:
+        pizza_id: ID пиццы
+        conn: Соединение с базой данных
 
+    Returns:
+        Кортеж (пицца, список пар (ингредиент, количество), цена)
 
+    Raises:
+        ValueError: Если пицца не найдена или недоступна
+        sqlite3.Error: При ошибке работы с БД
+    """
+    # Получаем пиццу, рецепт с названиями ингредиентов и цену
+    details = get_pizza_with_recipe(pizza_id, conn)
+    if details is None or not details[0].is_visible:
+        raise ValueError(f"Пицца не найдена или недоступна")
+
+    pizza, ingredients, price = details
+    if price is None:
+        raise ValueError("Невозможно рассчитать стоимость пиццы")
+
+    return pizza, ingredients, price
+
+
+@traced
+@timed(OPERATION_LATENCY)
 def order_pizza(pizza_id: int) -> bool:
     """Заказать пиццу (списать ингредиенты).
 
@@ -88,34 +118,225 @@ def order_pizza(pizza_id: int) -> bool:
         sqlite3.Error: При ошибке работы с БД
     """
     try:
-        with get_connection() as conn:
+        with get_connection() as conn, unit_of_work(conn):
             # Проверяем существование и доступность пиццы
             pizza = get_pizza_by_id(pizza_id, conn)
             if pizza is None or not pizza.is_visible:
+                ORDERS_REJECTED.labels("unavailable").inc()
                 raise ValueError(f"Пицца не найдена или недоступна")
 
-            # Проверяем наличие ингредиентов
-            if not check_recipe_ingredients_available(pizza_id, conn):
+            # Списываем ингредиенты одним защищенным UPDATE
+            deducted = deduct_recipe_ingredients(pizza_id, conn)
+            if deducted is None:
+                ORDERS_REJECTED.labels("out_of_stock").inc()
                 raise ValueError("Недостаточно ингредиентов для приготовления пиццы")
 
-            # Получаем рецепт
-            recipe = get_recipe_for_pizza(pizza_id, conn)
+            # Пересчитываем видимость только для ингредиентов, которых теперь
+            # не хватает на порцию хотя бы одного рецепта
+            update_pizzas_visibility_by_ingredients(
+                get_depleted_ingredients(deducted, conn), conn
+            )
+
+            # Цена фиксируется в транзакции заказа, а не при записи журнала
+            price = get_pizza_cost(pizza_id, conn)
+
+        ORDERS_PLACED.inc()
+        # Запись в журнал выполняется фоновым потоком после фиксации заказа
+        get_order_journal().record([(pizza_id, 1, price)])
+        return True
+
+    except sqlite3.Error as error:
+        ORDERS_REJECTED.labels("db_error").inc()
+        raise sqlite3.Error(f"Ошибка при оформлении заказа: {error}")
+
+
+def allocate_order_lines(
+    items: List[Tuple[int, int]],
+    visibility: Dict[int, bool],
+    recipes: Dict[int, List[Recipe]],
+    remaining: Dict[int, int],
+    demand: Dict[int, int],
+) -> List[OrderLineResult]:
+    """Распределить остатки между строками заказа.
+
+    Строки обрабатываются по порядку: строка принимается, если на нее хватает
+    ингредиентов после предыдущих принятых строк, иначе отклоняется целиком.
+    Потребность принятых строк вычитается из remaining и добавляется в demand.
+
+    Args:
+        items: Строки заказа (ID пиццы, количество)
+        visibility: Видимость пицц по ID
+        recipes: Рецепты пицц по ID
+        remaining: Остатки ингредиентов (изменяется)
+        demand: Суммарная потребность принятых строк (изменяется)
+
+    Returns:
+        Результаты по каждой строке заказа в исходном порядке
+    """
+    results = []
+
+    for pizza_id, quantity in items:
+        if quantity <= 0:
+            results.append(
+                OrderLineResult(pizza_id, quantity, False, ERROR_INVALID_QUANTITY)
+            )
+            continue
+
+        if not visibility.get(pizza_id, False):
+            results.append(
+                OrderLineResult(pizza_id, quantity, False, ERROR_UNAVAILABLE)
+            )
+            continue
+
+        line = {
+            item.id_ingredient: item.amount * quantity for item in recipes[pizza_id]
+        }
+        if any(remaining[key] < amount for key, amount in line.items()):
+            results.append(
+                OrderLineResult(pizza_id, quantity, False, ERROR_OUT_OF_STOCK)
+            )
+            continue
+
+        for key, amount in line.items():
+            remaining[key] -= amount
+            demand[key] = demand.get(key, 0) + amount
+
+        results.append(OrderLineResult(pizza_id, quantity, True))
+
+    return results
+
+
+def complete_order(
+    results: List[OrderLineResult], prices: Dict[int, Optional[float]]
+) -> None:
+    """Учесть зафиксированный заказ в метриках и журнале заказов.
+
+    Args:
+        results: Результаты по строкам заказа
+        prices: Цены пицц, прочитанные в транзакции заказа
+    """
+    for result in results:
+        if result.success:
+            ORDERS_PLACED.inc()
+        else:
+            ORDERS_REJECTED.labels(REJECT_REASONS[result.error]).inc()
+
+    get_order_journal().record(
+        [
+            (result.id_pizza, result.quantity, prices.get(result.id_pizza))
+            for result in results
+            if result.success
+        ]
+    )
+
+
+@traced
+@timed(OPERATION_LATENCY)
+def order_pizzas(items: List[Tuple[int, int]]) -> List[OrderLineResult]:
+    """Заказать несколько пицц разных видов одной транзакцией.
+
+    Потребность в ингредиентах суммируется по всей корзине и сверяется
+    с остатками, полученными одним запросом. Строки обрабатываются по порядку:
+    строка принимается, если на нее хватает ингредиентов после предыдущих
+    принятых строк, иначе отклоняется целиком. Все принятые строки списываются
+    в одной транзакции, видимость пицц пересчитывается один раз в конце.
+
+    Args:
+        items: Список кортежей (ID пиццы, количество)
+
+    Returns:
+        Результаты по каждой строке заказа в исходном порядке
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    return place_orders([items])[0]
+
+
+@traced
+@timed(OPERATION_LATENCY)
+def order_batch(
+    orders: List[List[Tuple[int, int]]], count_errors: bool = True
+) -> List[List[OrderLineResult]]:
+    """Оформить несколько независимых заказов одной транзакцией (group commit).
+
+    Остатки для всех пицц из всех заказов читаются одним запросом, заказы
+    обрабатываются по порядку так же, как строки в order_pizzas, а суммарная
+    потребность списывается одним UPDATE. Фиксация выполняется один раз
+    на всю пачку заказов.
+
+    Args:
+        orders: Заказы, каждый - список кортежей (ID пиццы, количество)
+        count_errors: Учитывать строки в метрике отклонений при ошибке БД
+            (False, если вызывающий повторит заказы по отдельности)
+
+    Returns:
+        Результаты по строкам для каждого заказа в исходном порядке
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД (ни один заказ не оформлен)
+    """
+    return place_orders(orders, count_errors)
+
+
+def place_orders(
+    orders: List[List[Tuple[int, int]]], count_errors: bool = True
+) -> List[List[OrderLineResult]]:
+    """Оформить заказы одной транзакцией (общая часть order_pizzas и order_batch).
+
+    Args:
+        orders: Заказы, каждый - список кортежей (ID пиццы, количество)
+        count_errors: Учитывать строки в метрике отклонений при ошибке БД
+
+    Returns:
+        Результаты по строкам для каждого заказа в исходном порядке
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        # Блокируем запись на время проверки и списания
+        with get_connection() as conn, unit_of_work(conn):
+
+            visibility, recipes, stock = get_basket_stock(
+                (pizza_id for items in orders for pizza_id, _ in items), conn
+            )
+
+            remaining = dict(stock)
+            demand: Dict[int, int] = {}
+            batch_results = [
+                allocate_order_lines(items, visibility, recipes, remaining, demand)
+                for items in orders
+            ]
 
-            # Списываем ингредиенты
-            for item in recipe:
-                current = get_ingredient_amount(item.id_ingredient, conn)
-                if current is None:
-                    raise ValueError(
-                        f"Ошибка при получении количества ингредиента {item.id_ingredient}"
-                    )
+            # Списываем суммарную потребность принятых строк
+            if not deduct_ingredient_amounts(demand, conn):
+                raise sqlite3.Error("Остатки изменились во время оформления заказа")
 
-                new_amount = current.amount - item.amount
-                set_ingredient_amount(item.id_ingredient, new_amount, conn)
+            # Обновляем видимость пицц один раз для всех заказов и только
+            # для ингредиентов, которых теперь не хватает хотя бы одному рецепту
+            depleted = get_depleted_ingredients(
+                {key: remaining[key] for key in demand}, conn
+            )
+            update_pizzas_visibility_by_ingredients(depleted, conn)
 
-            # Обновляем видимость пицц
-            update_pizzas_visibility_by_ingredients(conn)
+            # Цены для журнала фиксируются в транзакции заказа
+            prices = get_pizza_prices(
+                (
+                    result.id_pizza
+                    for results in batch_results
+                    for result in results
+                    if result.success
+                ),
+                conn,
+            )
 
-            return True
+        # Учитываем заказы в метриках и журнале только после фиксации транзакции
+        for results in batch_results:
+            complete_order(results, prices)
+        return batch_results
 
     except sqlite3.Error as error:
+        if count_errors:
+            ORDERS_REJECTED.labels("db_error").inc(sum(len(items) for items in orders))
         raise sqlite3.Error(f"Ошибка при оформлении заказа: {error}")
@@ -2,23 +2,119 @@
 
 """Модуль, содержащий настройки приложения (путь к базе данных и другие параметры)."""
 
+import os
 from pathlib import Path
-from typing import Final
+from typing import Callable, Final, TypeVar
+
+T = TypeVar("T")
+
+
+def _env(name: str, default: T, cast: Callable[[str], T]) -> T:
+    """Прочитать настройку из переменной окружения PIZZA_<name>.
+
+    Args:
+        name: Имя настройки без префикса
+        default: Значение по умолчанию, если переменная не задана
+        cast: Функция преобразования строкового значения
+
+    Returns:
+        Значение настройки
+    """
+    value = os.environ.get(f"PIZZA_{name}")
+    return default if value is None else cast(value)
+
+
+def _to_bool(value: str) -> bool:
+    """Преобразовать строковое значение переменной окружения в bool."""
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
 
 # Пути
 BASE_DIR: Final[Path] = Path(__file__).parent.parent.parent
 DATA_DIR: Final[Path] = BASE_DIR / "data"
 DB_NAME: Final[str] = "pizzeria.db"
-DB_PATH: Final[Path] = DATA_DIR / DB_NAME
+DB_PATH: Final[Path] = Path(_env("DB_PATH", str(DATA_DIR / DB_NAME), str))
 
 # Создаем директорию для данных, если её нет
 DATA_DIR.mkdir(exist_ok=True)
 
-# Настройки БД
-DB_TIMEOUT: Final[float] = 5.0  # таймаут подключения к БД в секундах
-DB_JOURNAL_MODE: Final[str] = "WAL"  # режим журналирования
-DB_FOREIGN_KEYS: Final[bool] = True  # проверка внешних ключей
+# Настройки БД (переопределяются переменными окружения PIZZA_<ИМЯ>)
+DB_TIMEOUT: Final[float] = _env("DB_TIMEOUT", 5.0, float)  # таймаут подключения (сек)
+DB_JOURNAL_MODE: Final[str] = _env("DB_JOURNAL_MODE", "WAL", str)  # журналирование
+DB_FOREIGN_KEYS: Final[bool] = _env("DB_FOREIGN_KEYS", True, _to_bool)  # внешние ключи
+
+# Параметры производительности SQLite (PRAGMA)
+DB_SYNCHRONOUS: Final[str] = _env("DB_SYNCHRONOUS", "NORMAL", str)  # уровень fsync
+DB_CACHE_SIZE: Final[int] = _env("DB_CACHE_SIZE", -16000, int)  # < 0 - размер в КиБ
+DB_MMAP_SIZE: Final[int] = _env("DB_MMAP_SIZE", 64 * 1024 * 1024, int)  # байт
+DB_TEMP_STORE: Final[str] = _env("DB_TEMP_STORE", "MEMORY", str)  # временные таблицы
+DB_BUSY_TIMEOUT: Final[int] = _env("DB_BUSY_TIMEOUT", int(DB_TIMEOUT * 1000), int)  # мс
+
+# Настройки пула соединений
+DB_POOL_MAX_SIZE: Final[int] = _env("DB_POOL_MAX_SIZE", 8, int)  # предел соединений
+DB_POOL_IDLE_CHECK: Final[float] = _env("DB_POOL_IDLE_CHECK", 30.0, float)  # сек
+DB_READ_POOL_MAX_SIZE: Final[int] = _env(
+    "DB_READ_POOL_MAX_SIZE", 16, int
+)  # предел соединений только для чтения (просмотр меню)
+
+# Асинхронный фасад БД (app.db.aio)
+DB_AIO_WORKERS: Final[int] = _env("DB_AIO_WORKERS", 4, int)  # потоков и соединений
+DB_AIO_TIMEOUT: Final[float] = _env(
+    "DB_AIO_TIMEOUT", 5.0, float
+)  # сек, 0 - без ограничения
+
+# Трассировка SQL (статистика по операциям и журнал медленных запросов)
+DB_SQL_TRACE: Final[bool] = _env("DB_SQL_TRACE", False, _to_bool)  # статистика
+DB_SLOW_QUERY_MS: Final[float] = _env("DB_SLOW_QUERY_MS", 0.0, float)  # 0 - выключен
+DB_SLOW_QUERY_LOG: Final[Path] = Path(
+    _env("DB_SLOW_QUERY_LOG", str(DATA_DIR / "slow_queries.log"), str)
+)
+DB_SLOW_QUERY_PARAMS: Final[bool] = _env(
+    "DB_SLOW_QUERY_PARAMS", False, _to_bool
+)  # писать значения параметров (данные клиентов и заказов) в журнал
+DB_TRACE_MAX_STATEMENTS: Final[int] = _env("DB_TRACE_MAX_STATEMENTS", 100, int)
+
+# Метрики (HTTP-эндпоинт /metrics и/или файл, записываемый при выходе)
+METRICS_HOST: Final[str] = _env("METRICS_HOST", "127.0.0.1", str)  # адрес сервера
+METRICS_PORT: Final[int] = _env("METRICS_PORT", 0, int)  # 0 - сервер выключен
+METRICS_DUMP: Final[str] = _env("METRICS_DUMP", "", str)  # пусто - без файла
+
+# Журнал заказов (фоновая запись порциями)
+ORDER_JOURNAL_ENABLED: Final[bool] = _env("ORDER_JOURNAL_ENABLED", True, _to_bool)
+ORDER_JOURNAL_QUEUE_SIZE: Final[int] = _env("ORDER_JOURNAL_QUEUE_SIZE", 10000, int)
+ORDER_JOURNAL_BATCH_SIZE: Final[int] = _env("ORDER_JOURNAL_BATCH_SIZE", 500, int)
+ORDER_JOURNAL_FLUSH_INTERVAL: Final[float] = _env(
+    "ORDER_JOURNAL_FLUSH_INTERVAL", 0.2, float
+)  # сек между записями порций
+ORDER_JOURNAL_PUT_TIMEOUT: Final[float] = _env(
+    "ORDER_JOURNAL_PUT_TIMEOUT", 1.0, float
+)  # сек ожидания места в очереди
+
+# Прием заказов (единственный пишущий поток, групповая фиксация)
+ORDER_INTAKE_ENABLED: Final[bool] = _env("ORDER_INTAKE_ENABLED", True, _to_bool)
+ORDER_INTAKE_QUEUE_SIZE: Final[int] = _env("ORDER_INTAKE_QUEUE_SIZE", 10000, int)
+ORDER_INTAKE_BATCH_SIZE: Final[int] = _env("ORDER_INTAKE_BATCH_SIZE", 128, int)
+ORDER_INTAKE_MAX_WAIT: Final[float] = _env(
+    "ORDER_INTAKE_MAX_WAIT", 0.0, float
+)  # сек добора пачки после первого заказа (0 - только уже ожидающие)
+ORDER_INTAKE_PUT_TIMEOUT: Final[float] = _env(
+    "ORDER_INTAKE_PUT_TIMEOUT", 1.0, float
+)  # сек ожидания места в очереди
+
+# HTTP API (python -m app.api.server)
+API_HOST: Final[str] = _env("API_HOST", "127.0.0.1", str)  # адрес сервера
+API_PORT: Final[int] = _env("API_PORT", 8080, int)  # порт сервера
+API_WORKERS: Final[int] = _env("API_WORKERS", DB_POOL_MAX_SIZE, int)  # потоков
+API_KEEPALIVE_TIMEOUT: Final[float] = _env(
+    "API_KEEPALIVE_TIMEOUT", 5.0, float
+)  # сек простоя соединения до закрытия
+API_MAX_BODY: Final[int] = _env("API_MAX_BODY", 1024 * 1024, int)  # байт в теле
+
+# Настройки кэша меню
+MENU_CACHE_MAX_SIZE: Final[int] = _env("MENU_CACHE_MAX_SIZE", 1024, int)  # записей
+
+# Настройки пакетных операций (пополнение из файла, импорт и экспорт)
+BATCH_CHUNK_SIZE: Final[int] = _env("BATCH_CHUNK_SIZE", 1000, int)  # строк в порции
 
 # Настройки приложения
 DEFAULT_COST_FACTOR: Final[float] = 1.0  # множитель стоимости по умолчанию
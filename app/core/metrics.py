@@ -0,0 +1,555 @@
+# app/core/metrics.py
+
+"""Модуль, содержащий реестр метрик в текстовом формате Prometheus и метрики приложения."""
+
+import contextlib
+import functools
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+F = TypeVar("F", bound=Callable)
+
+# Границы корзин гистограмм задержек по умолчанию, сек
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Значения меток и строки (метки, значение), которые возвращает сборщик gauge
+Labels = Tuple[str, ...]
+Sample = Tuple[Labels, float]
+
+
+def _escape(value: str) -> str:
+    """Экранировать значение метки для текстового формата."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Отформатировать значение метрики для текстового формата."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Сформировать блок меток вида {name="value",...}."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _ThreadCells:
+    """Набор ячеек, каждая из которых изменяется только своим потоком.
+
+    Запись в ячейку не требует блокировки: блокировка берется один раз при
+    первом обращении потока. Ячейка привязана к идентификатору потока, поэтому
+    их число ограничено числом одновременно живущих потоков. При чтении
+    значения ячеек суммируются.
+    """
+
+    def __init__(self, width: int) -> None:
+        self._width = width
+        self._lock = threading.Lock()
+        self._cells: Dict[int, List[float]] = {}
+
+    def cell(self) -> List[float]:
+        """Получить ячейку текущего потока."""
+        thread_id = threading.get_ident()
+        cell = self._cells.get(thread_id)
+        if cell is None:
+            with self._lock:
+                cell = self._cells.setdefault(thread_id, [0.0] * self._width)
+        return cell
+
+    def total(self) -> List[float]:
+        """Сумма значений всех ячеек по позициям."""
+        with self._lock:
+            cells = list(self._cells.values())
+
+        totals = [0.0] * self._width
+        for cell in cells:
+            for index, value in enumerate(cell):
+                totals[index] += value
+        return totals
+
+
+class _Metric:
+    """Базовый класс метрики с набором меток."""
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["MetricsRegistry"] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._lock = threading.Lock()
+        self._children: Dict[Labels, object] = {}
+
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str, **kwargs: str):
+        """Получить дочернюю метрику для набора значений меток.
+
+        Args:
+            *values: Значения меток по порядку
+            **kwargs: Значения меток по именам
+
+        Returns:
+            Дочерняя метрика
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        """Дочерняя метрика для метрики без меток."""
+        if self.labelnames:
+            raise ValueError(f"Метрика {self.name} требует метки {self.labelnames}")
+        return self.labels()
+
+    def _items(self) -> List[Tuple[Labels, object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        """Строки метрики: (имя, значения меток, имена меток, значение)."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Сформировать описание метрики в текстовом формате."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, values, names, value in self.samples():
+            lines.append(
+                f"{name}{_format_labels(names, values)} {_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self) -> None:
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Увеличить счетчик."""
+        if amount < 0:
+            raise ValueError("Счетчик нельзя уменьшать")
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.total()[0]
+
+
+class Counter(_Metric):
+    """Монотонный счетчик (имя по соглашению оканчивается на _total)."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Увеличить счетчик без меток."""
+        self._default().inc(amount)
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        for values, child in self._items():
+            yield self.name, values, self.labelnames, child.value
+
+
+class _GaugeChild:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Установить значение."""
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Изменить значение на amount."""
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(_Metric):
+    """Текущее значение величины.
+
+    Значения можно выставлять напрямую или получать от сборщика, который
+    вызывается при каждом чтении метрик (например, остатки из БД). Сборщик
+    не нагружает горячий путь: данные читаются только по запросу.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["MetricsRegistry"] = None,
+        collector: Optional[Callable[[], Iterable[Sample]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.collector = collector
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """Установить значение метрики без меток."""
+        self._default().set(value)
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        for values, child in self._items():
+            yield self.name, values, self.labelnames, child.value
+
+        if self.collector is not None:
+            for values, value in self.collector():
+                yield self.name, tuple(
+                    str(item) for item in values
+                ), self.labelnames, value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._buckets = buckets
+        # Ячейка: счетчики корзин (без +Inf), затем сумма и общее количество
+        self._cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        """Учесть наблюдение."""
+        cell = self._cells.cell()
+        for index, bound in enumerate(self._buckets):
+            if value <= bound:
+                cell[index] += 1
+                break
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self) -> Generator[None, None, None]:
+        """Замерить время выполнения блока в секундах."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Накопленные значения: (счетчики корзин, сумма, количество)."""
+        totals = self._cells.total()
+        return totals[:-2], totals[-2], totals[-1]
+
+
+class Histogram(_Metric):
+    """Гистограмма распределения (например, задержек) по корзинам."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional["MetricsRegistry"] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Учесть наблюдение для метрики без меток."""
+        self._default().observe(value)
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        names = self.labelnames + ("le",)
+        for values, child in self._items():
+            counts, total, count = child.snapshot()
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", values + (repr(bound),), names, cumulative
+            yield f"{self.name}_bucket", values + ("+Inf",), names, count
+            yield f"{self.name}_sum", values, self.labelnames, total
+            yield f"{self.name}_count", values, self.labelnames, count
+
+
+def timed(histogram: Histogram, *values: str) -> Callable[[F], F]:
+    """Декоратор: замерять длительность вызова в гистограмме.
+
+    Args:
+        histogram: Гистограмма задержек
+        *values: Значения меток гистограммы (по умолчанию — имя функции)
+    """
+
+    def decorator(func: F) -> F:
+        child = histogram.labels(*(values or (func.__name__,)))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsRegistry:
+    """Реестр метрик с выводом в текстовом формате Prometheus."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        """Зарегистрировать метрику.
+
+        Raises:
+            ValueError: Если метрика с таким именем уже есть
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Сформировать все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def dump_metrics(path: Path, registry: MetricsRegistry = REGISTRY) -> None:
+    """Записать метрики в файл (атомарно, через временный файл).
+
+    Args:
+        path: Путь к файлу
+        registry: Реестр метрик
+
+    Raises:
+        OSError: При ошибке записи файла
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.tmp")
+    temporary.write_text(registry.render(), "utf-8")
+    os.replace(temporary, path)
+
+
+def start_metrics_server(
+    host: str, port: int, registry: MetricsRegistry = REGISTRY
+) -> ThreadingHTTPServer:
+    """Запустить HTTP-сервер метрик в фоновом потоке.
+
+    Метрики отдаются по пути /metrics.
+
+    Args:
+        host: Адрес для прослушивания
+        port: Порт
+        registry: Реестр метрик
+
+    Returns:
+        Запущенный сервер (остановка через shutdown())
+
+    Raises:
+        OSError: Если порт занят
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            try:
+                body = registry.render().encode("utf-8")
+            except Exception as error:
+                self.send_error(500, str(error))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            # Не засоряем консольный интерфейс журналом запросов
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    return server
+
+
+# ---------------- Метрики приложения ----------------
+
+ORDERS_PLACED = Counter(
+    "pizza_orders_placed_total", "Принятые заказы (строки заказа)", registry=REGISTRY
+)
+ORDERS_REJECTED = Counter(
+    "pizza_orders_rejected_total",
+    "Отклоненные заказы (строки заказа) по причинам",
+    ["reason"],
+    registry=REGISTRY,
+)
+OPERATION_LATENCY = Histogram(
+    "pizza_operation_duration_seconds",
+    "Длительность клиентских операций (заказы и меню)",
+    ["operation"],
+    registry=REGISTRY,
+)
+DB_STATEMENT_LATENCY = Histogram(
+    "pizza_db_statement_duration_seconds",
+    "Длительность SQL-выражений по операциям",
+    ["operation"],
+    registry=REGISTRY,
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5),
+)
+INGREDIENT_STOCK = Gauge(
+    "pizza_ingredient_stock",
+    "Остаток ингредиента на складе",
+    ["id_ingredient", "name"],
+    registry=REGISTRY,
+)
+ORDER_JOURNAL_WRITTEN = Counter(
+    "pizza_order_journal_written_total",
+    "Заказы, записанные в журнал",
+    registry=REGISTRY,
+)
+ORDER_JOURNAL_DROPPED = Counter(
+    "pizza_order_journal_dropped_total",
+    "Заказы, не попавшие в журнал, по причинам",
+    ["reason"],
+    registry=REGISTRY,
+)
+ORDER_JOURNAL_QUEUE = Gauge(
+    "pizza_order_journal_queue",
+    "Заказы в очереди на запись в журнал",
+    registry=REGISTRY,
+)
+ORDER_INTAKE_BATCH = Histogram(
+    "pizza_order_intake_batch_size",
+    "Число заказов в пачке, оформленной одной транзакцией",
+    registry=REGISTRY,
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+ORDER_INTAKE_QUEUE = Gauge(
+    "pizza_order_intake_queue",
+    "Заказы в очереди на оформление",
+    registry=REGISTRY,
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    "pizza_http_request_duration_seconds",
+    "Длительность запросов HTTP API по маршрутам и кодам ответа",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+
+
+# ---------------- Подключение метрик приложения ----------------
+
+# Метрики приложения подключаются один раз на процесс
+_app_metrics_lock = threading.Lock()
+_app_metrics_installed = False
+
+
+def collect_stock_levels() -> Iterator[Sample]:
+    """Остатки ингредиентов для метрики pizza_ingredient_stock."""
+    # Импорт при вызове: модули операций сами используют метрики этого модуля
+    from app.admin.operations import get_stock_report
+
+    for ingredient, amount in get_stock_report():
+        yield (ingredient.id_ingredient, ingredient.name_ingredient), amount
+
+
+def observe_statement(operation: str, duration: float) -> None:
+    """Учесть длительность SQL-выражения в метрике pizza_db_statement_duration_seconds."""
+    DB_STATEMENT_LATENCY.labels(operation).observe(duration)
+
+
+def setup_app_metrics() -> None:
+    """Подключить метрики, которые собираются из БД и трассировщика SQL.
+
+    Подписывает гистограмму длительности SQL-выражений на трассировщик и
+    подключает сборщик остатков ингредиентов. Вызывать нужно до открытия
+    первого соединения с БД: трассировка подключается к соединению при его
+    создании. Повторные вызовы ничего не делают.
+    """
+    global _app_metrics_installed
+
+    from app.db.tracing import get_tracer
+
+    with _app_metrics_lock:
+        if _app_metrics_installed:
+            return
+        _app_metrics_installed = True
+
+    get_tracer().add_observer(observe_statement)
+    INGREDIENT_STOCK.collector = collect_stock_levels
@@ -2,7 +2,8 @@
 
 """Модуль, содержащий классы, представляющие данные (модели данных для пицц, ингредиентов и т.п.)."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 
 @dataclass
@@ -71,3 +72,57 @@ class Recipe:
 
     def __str__(self) -> str:
         return f"Ингредиент {self.id_ingredient} в пицце {self.id_pizza}: {self.amount} шт."
+
+
+@dataclass
+class OrderLineResult:
+    """Модель результата по одной строке заказа."""
+
+    id_pizza: int
+    quantity: int
+    success: bool
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        status = "принято" if self.success else f"отклонено ({self.error})"
+        return f"Пицца {self.id_pizza} x{self.quantity}: {status}"
+
+
+@dataclass
+class OrderRecord:
+    """Модель записи журнала заказов."""
+
+    created_at: float
+    lines: List[Tuple[int, int, Optional[float]]]
+
+    def __str__(self) -> str:
+        positions = ", ".join(
+            f"{pizza_id} x{quantity}" for pizza_id, quantity, _ in self.lines
+        )
+        return f"Заказ от {self.created_at:.3f}: {positions}"
+
+
+@dataclass
+class BatchLineError:
+    """Модель ошибки в строке пакетной операции."""
+
+    line: int
+    error: str
+
+    def __str__(self) -> str:
+        return f"Строка {self.line}: {self.error}"
+
+
+@dataclass
+class BatchResult:
+    """Модель результата пакетной операции над файлом."""
+
+    processed: int = 0
+    applied: int = 0
+    errors: List[BatchLineError] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"Обработано строк: {self.processed}, применено: {self.applied}, "
+            f"ошибок: {len(self.errors)}"
+        )
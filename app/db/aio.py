@@ -0,0 +1,325 @@
+# app/db/aio.py
+
+"""Асинхронный фасад над запросами к базе данных.
+
+Функции модуля повторяют функции app.db.queries, но являются корутинами:
+запрос выполняется в отдельном ограниченном пуле потоков со своими
+соединениями и не блокирует цикл событий. Каждый вызов принимает
+необязательный аргумент timeout (сек); по истечении таймаута или при отмене
+задачи запрос, который еще не начался, снимается с очереди, а уже
+выполняющийся прерывается через sqlite3.Connection.interrupt().
+
+Пример:
+    from app.db import aio
+
+    menu = await aio.get_menu(timeout=0.5)
+    await aio.transaction(write_recipe_items, pizza_id, items)
+"""
+
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from app.core.config import DB_AIO_TIMEOUT, DB_AIO_WORKERS
+from app.db import queries
+from app.db.connection import ConnectionPool, get_pool, unit_of_work
+
+T = TypeVar("T")
+
+# Значение timeout по умолчанию: взять таймаут фасада
+_DEFAULT: Any = object()
+
+
+class _Call:
+    """Вызов в пуле потоков с возможностью прерывания."""
+
+    def __init__(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def start(self, conn: sqlite3.Connection) -> None:
+        """Отметить начало выполнения на соединении conn.
+
+        Raises:
+            sqlite3.OperationalError: Если вызов уже отменен
+        """
+        with self._lock:
+            if self.cancelled:
+                raise sqlite3.OperationalError("interrupted")
+            self._conn = conn
+
+    def finish(self) -> None:
+        """Отметить окончание выполнения."""
+        with self._lock:
+            self._conn = None
+
+    def interrupt(self) -> None:
+        """Отменить вызов и прервать выполняющийся запрос."""
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+
+class AsyncDatabase:
+    """Выполнение синхронных функций работы с БД в отдельном пуле потоков.
+
+    Пул потоков и его пул соединений создаются при первом вызове: каждый из
+    workers потоков берет соединение из собственного пула размером workers,
+    поэтому асинхронные запросы не занимают соединения общего пула приложения.
+    Число одновременно выполняющихся запросов ограничено числом потоков,
+    остальные ждут в очереди пула.
+    """
+
+    def __init__(
+        self,
+        workers: int = DB_AIO_WORKERS,
+        timeout: Optional[float] = DB_AIO_TIMEOUT or None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Число потоков БД должно быть положительным")
+
+        self.workers = workers
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ConnectionPool] = None
+
+    def _ensure_started(self) -> ThreadPoolExecutor:
+        """Создать пул потоков и пул соединений при первом вызове."""
+        with self._lock:
+            if self._executor is None:
+                shared = get_pool()
+                self._pool = ConnectionPool(
+                    db_path=shared.db_path,
+                    max_size=self.workers,
+                    idle_check=shared.idle_check,
+                    timeout=shared.timeout,
+                    on_connect=shared.on_connect,
+                )
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="db-aio"
+                )
+            return self._executor
+
+    def _execute(self, call: _Call) -> Any:
+        """Выполнить вызов в потоке пула на соединении этого потока."""
+        conn = self._pool.acquire()
+        try:
+            call.start(conn)
+            try:
+                return call.func(*call.args, conn=conn, **call.kwargs)
+            finally:
+                call.finish()
+        finally:
+            self._pool.release(conn)
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = _DEFAULT,
+        **kwargs: Any,
+    ) -> T:
+        """Выполнить func(*args, conn=<соединение>, **kwargs) в пуле потоков.
+
+        Args:
+            func: Синхронная функция, принимающая соединение аргументом conn
+            *args: Позиционные аргументы func
+            timeout: Таймаут вызова, сек (None - без ограничения,
+                по умолчанию - таймаут фасада)
+            **kwargs: Именованные аргументы func
+
+        Returns:
+            Результат func
+
+        Raises:
+            TimeoutError: Если вызов не завершился за timeout секунд
+            asyncio.CancelledError: Если задача отменена
+            sqlite3.Error: При ошибке работы с БД
+        """
+        if timeout is _DEFAULT:
+            timeout = self.timeout
+
+        call = _Call(func, args, kwargs)
+        future = self._ensure_started().submit(self._execute, call)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Не начавшийся вызов снимается с очереди, начавшийся - прерывается
+            if not future.cancel():
+                call.interrupt()
+            raise
+
+    async def transaction(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = _DEFAULT,
+        **kwargs: Any,
+    ) -> T:
+        """Выполнить func в одной транзакции (unit_of_work) в пуле потоков.
+
+        Вспомогательные функции записи, вызванные внутри func на переданном
+        соединении, присоединяются к этой транзакции. При ошибке, таймауте
+        или отмене транзакция откатывается.
+
+        Args:
+            func: Синхронная функция, принимающая соединение аргументом conn
+            *args: Позиционные аргументы func
+            timeout: Таймаут вызова, сек
+            **kwargs: Именованные аргументы func
+
+        Returns:
+            Результат func
+        """
+        return await self.run(_in_transaction, func, *args, timeout=timeout, **kwargs)
+
+    def close(self) -> None:
+        """Дождаться выполняющихся вызовов и закрыть соединения пула."""
+        with self._lock:
+            executor, pool = self._executor, self._pool
+            self._executor = self._pool = None
+
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            pool.close_all()
+
+
+def _in_transaction(
+    func: Callable[..., T], *args: Any, conn: sqlite3.Connection, **kwargs: Any
+) -> T:
+    """Выполнить func внутри unit_of_work на соединении conn."""
+    with unit_of_work(conn):
+        return func(*args, conn=conn, **kwargs)
+
+
+_database = AsyncDatabase()
+
+
+def get_async_database() -> AsyncDatabase:
+    """Получить общий асинхронный фасад БД приложения."""
+    return _database
+
+
+async def run(
+    func: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = _DEFAULT,
+    **kwargs: Any,
+) -> T:
+    """Выполнить функцию с аргументом conn в общем пуле потоков БД."""
+    return await _database.run(func, *args, timeout=timeout, **kwargs)
+
+
+async def transaction(
+    func: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = _DEFAULT,
+    **kwargs: Any,
+) -> T:
+    """Выполнить функцию с аргументом conn в одной транзакции в пуле потоков БД."""
+    return await _database.transaction(func, *args, timeout=timeout, **kwargs)
+
+
+def _async_query(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Сделать асинхронный вариант функции из app.db.queries."""
+
+    @functools.wraps(func)
+    async def wrapper(
+        *args: Any, timeout: Optional[float] = _DEFAULT, **kwargs: Any
+    ) -> T:
+        return await _database.run(func, *args, timeout=timeout, **kwargs)
+
+    return wrapper
+
+
+# ---------------- PIZZA ----------------
+
+get_all_pizzas = _async_query(queries.get_all_pizzas)
+get_pizza_by_id = _async_query(queries.get_pizza_by_id)
+create_pizza = _async_query(queries.create_pizza)
+update_pizza_visibility = _async_query(queries.update_pizza_visibility)
+set_pizza_hidden = _async_query(queries.set_pizza_hidden)
+delete_pizza = _async_query(queries.delete_pizza)
+
+# ---------------- PIZZA COST ----------------
+
+get_pizza_cost = _async_query(queries.get_pizza_cost)
+get_pizza_prices = _async_query(queries.get_pizza_prices)
+set_pizza_cost = _async_query(queries.set_pizza_cost)
+get_pizza_base_cost = _async_query(queries.get_pizza_base_cost)
+
+# ---------------- CATALOG VERSION ----------------
+
+get_catalog_version = _async_query(queries.get_catalog_version)
+
+# ---------------- MENU ----------------
+
+get_menu = _async_query(queries.get_menu)
+get_pizza_with_recipe = _async_query(queries.get_pizza_with_recipe)
+
+# ---------------- CAPACITY ----------------
+
+get_pizza_capacities = _async_query(queries.get_pizza_capacities)
+
+# ---------------- INGREDIENT ----------------
+
+get_all_ingredients = _async_query(queries.get_all_ingredients)
+get_ingredient_by_id = _async_query(queries.get_ingredient_by_id)
+get_existing_ingredient_ids = _async_query(queries.get_existing_ingredient_ids)
+create_ingredient = _async_query(queries.create_ingredient)
+delete_ingredient = _async_query(queries.delete_ingredient)
+
+# ---------------- INGREDIENT COST ----------------
+
+get_ingredient_cost = _async_query(queries.get_ingredient_cost)
+set_ingredient_cost = _async_query(queries.set_ingredient_cost)
+
+# ---------------- INGREDIENT AMOUNT ----------------
+
+get_ingredient_amount = _async_query(queries.get_ingredient_amount)
+set_ingredient_amount = _async_query(queries.set_ingredient_amount)
+add_ingredient_amounts = _async_query(queries.add_ingredient_amounts)
+refill_ingredient_amounts = _async_query(queries.refill_ingredient_amounts)
+get_stock_levels = _async_query(queries.get_stock_levels)
+adjust_ingredient_amount = _async_query(queries.adjust_ingredient_amount)
+
+# ---------------- RECIPE ----------------
+
+get_recipe_for_pizza = _async_query(queries.get_recipe_for_pizza)
+upsert_recipe_item = _async_query(queries.upsert_recipe_item)
+write_recipe_items = _async_query(queries.write_recipe_items)
+delete_recipe_item = _async_query(queries.delete_recipe_item)
+delete_recipe_for_pizza = _async_query(queries.delete_recipe_for_pizza)
+check_recipe_ingredients_available = _async_query(
+    queries.check_recipe_ingredients_available
+)
+get_basket_stock = _async_query(queries.get_basket_stock)
+deduct_ingredient_amounts = _async_query(queries.deduct_ingredient_amounts)
+get_pizzas_with_ingredient = _async_query(queries.get_pizzas_with_ingredient)
+deduct_recipe_ingredients = _async_query(queries.deduct_recipe_ingredients)
+get_depleted_ingredients = _async_query(queries.get_depleted_ingredients)
+get_all_recipes = _async_query(queries.get_all_recipes)
+
+# ---------------- ORDERS ----------------
+
+write_orders = _async_query(queries.write_orders)
+
+# ---------------- ADDITION ----------------
+
+update_pizzas_visibility_by_ingredients = _async_query(
+    queries.update_pizzas_visibility_by_ingredients
+)
+update_pizzas_visibility_by_pizzas = _async_query(
+    queries.update_pizzas_visibility_by_pizzas
+)
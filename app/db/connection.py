@@ -4,16 +4,460 @@
 
 import contextlib
 import sqlite3
-from typing import Generator
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
-from app.core.config import DB_PATH
+from app.core.config import (
+    DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE,
+    DB_FOREIGN_KEYS,
+    DB_JOURNAL_MODE,
+    DB_MMAP_SIZE,
+    DB_PATH,
+    DB_POOL_IDLE_CHECK,
+    DB_POOL_MAX_SIZE,
+    DB_READ_POOL_MAX_SIZE,
+    DB_SYNCHRONOUS,
+    DB_TEMP_STORE,
+    DB_TIMEOUT,
+)
+from app.db.tracing import get_tracer
+
+# Допустимые значения строковых PRAGMA (подставляются в SQL без параметров)
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORES = ("DEFAULT", "FILE", "MEMORY")
+
+# PRAGMA, попадающие в отчет о параметрах соединения
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "foreign_keys",
+    "busy_timeout",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+)
+
+
+def _checked(value: str, allowed: Tuple[str, ...], name: str) -> str:
+    """Проверить строковое значение PRAGMA по списку допустимых."""
+    normalized = value.strip().upper()
+    if normalized not in allowed:
+        raise ValueError(f"Недопустимое значение {name}: {value}")
+    return normalized
+
+
+def configure_connection(conn: sqlite3.Connection) -> None:
+    """Применить к соединению настройки БД из конфигурации.
+
+    Выставляет режим журналирования, проверку внешних ключей, таймаут
+    ожидания блокировки и параметры производительности (synchronous,
+    cache_size, mmap_size, temp_store). Подключает трассировку SQL,
+    если она включена.
+
+    Args:
+        conn: Новое соединение с БД
+
+    Raises:
+        ValueError: Если в конфигурации задано недопустимое значение
+        sqlite3.Error: При ошибке применения настроек
+    """
+    journal_mode = _checked(DB_JOURNAL_MODE, JOURNAL_MODES, "journal_mode")
+    synchronous = _checked(DB_SYNCHRONOUS, SYNCHRONOUS_LEVELS, "synchronous")
+
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT)}")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA foreign_keys = {'ON' if DB_FOREIGN_KEYS else 'OFF'}")
+    _apply_cache_settings(conn)
+
+    get_tracer().install(conn)
+
+
+def configure_read_connection(conn: sqlite3.Connection) -> None:
+    """Применить настройки к соединению только для чтения.
+
+    Режим журналирования не меняется (его выставляют пишущие соединения),
+    вместо этого включается PRAGMA query_only: любая попытка записи через
+    такое соединение завершается ошибкой.
+
+    Args:
+        conn: Новое соединение с БД, открытое с mode=ro
+
+    Raises:
+        ValueError: Если в конфигурации задано недопустимое значение
+        sqlite3.Error: При ошибке применения настроек
+    """
+    conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT)}")
+    conn.execute("PRAGMA query_only = ON")
+    _apply_cache_settings(conn)
+
+    get_tracer().install(conn)
+
+
+def _apply_cache_settings(conn: sqlite3.Connection) -> None:
+    """Выставить параметры кэша, отображения в память и временных таблиц."""
+    temp_store = _checked(DB_TEMP_STORE, TEMP_STORES, "temp_store")
+
+    conn.execute(f"PRAGMA cache_size = {int(DB_CACHE_SIZE)}")
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA temp_store = {temp_store}")
+
+
+def get_connection_settings(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Прочитать фактические значения PRAGMA соединения.
+
+    Args:
+        conn: Соединение с БД
+
+    Returns:
+        Словарь {имя PRAGMA: значение}
+    """
+    return {
+        name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in REPORTED_PRAGMAS
+    }
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с привязкой к потокам.
+
+    Поток, уже держащий соединение, при повторном запросе получает то же самое
+    соединение (вложенные вызовы не открывают новых). Освобожденное соединение
+    возвращается в пул и в первую очередь выдается тому же потоку.
+    Проверка работоспособности выполняется только при выдаче соединения,
+    простаивавшего дольше idle_check секунд.
+
+    Пул с read_only=True открывает соединения через URI с mode=ro.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DB_PATH,
+        max_size: int = DB_POOL_MAX_SIZE,
+        idle_check: float = DB_POOL_IDLE_CHECK,
+        timeout: float = DB_TIMEOUT,
+        on_connect: Optional[
+            Callable[[sqlite3.Connection], None]
+        ] = configure_connection,
+        read_only: bool = False,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Размер пула соединений должен быть положительным")
+
+        self.db_path = db_path
+        self.max_size = max_size
+        self.idle_check = idle_check
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self.read_only = read_only
+
+        self._local = threading.local()
+        self._cond = threading.Condition(threading.Lock())
+        # Свободные соединения: (соединение, ID последнего потока, время освобождения)
+        self._idle: List[Tuple[sqlite3.Connection, int, float]] = []
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Число открытых соединений (выданных и свободных)."""
+        return self._size
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открыть новое соединение с БД."""
+        if self.read_only:
+            conn = sqlite3.connect(
+                f"{Path(self.db_path).resolve().as_uri()}?mode=ro",
+                timeout=self.timeout,
+                check_same_thread=False,
+                factory=get_tracer().connection_factory,
+                uri=True,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.timeout,
+                check_same_thread=False,
+                factory=get_tracer().connection_factory,
+            )
+        conn.row_factory = sqlite3.Row
+
+        if self.on_connect is not None:
+            try:
+                self.on_connect(conn)
+            except Exception:
+                conn.close()
+                raise
+
+        return conn
+
+    def _is_alive(self, conn: sqlite3.Connection) -> bool:
+        """Проверить, что соединение пригодно для работы."""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _take_idle(self, thread_id: int) -> Optional[Tuple[sqlite3.Connection, float]]:
+        """Забрать свободное соединение, предпочитая использованное этим потоком."""
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][1] == thread_id:
+                conn, _, released_at = self._idle.pop(index)
+                return conn, released_at
+
+        if self._idle:
+            conn, _, released_at = self._idle.pop()
+            return conn, released_at
+
+        return None
+
+    def acquire(self) -> sqlite3.Connection:
+        """Получить соединение из пула.
+
+        Returns:
+            Соединение с БД
+
+        Raises:
+            sqlite3.Error: Если свободное соединение не появилось за timeout секунд
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        thread_id = threading.get_ident()
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while True:
+                taken = self._take_idle(thread_id)
+                if taken is not None:
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise sqlite3.Error("Нет свободных соединений в пуле")
+
+        try:
+            if taken is None:
+                conn = self._connect()
+            else:
+                conn, released_at = taken
+                if (
+                    time.monotonic() - released_at > self.idle_check
+                    and not self._is_alive(conn)
+                ):
+                    with contextlib.suppress(sqlite3.Error):
+                        conn.close()
+                    conn = self._connect()
+        except sqlite3.Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Вернуть соединение в пул.
+
+        Незавершенная транзакция откатывается, когда поток освобождает
+        соединение на самом внешнем уровне вложенности.
+
+        Args:
+            conn: Соединение, полученное через acquire()
+
+        Raises:
+            sqlite3.ProgrammingError: Если соединение выдано другому потоку
+                или не этим пулом (оно не закрывается: им может пользоваться
+                поток-владелец)
+        """
+        if getattr(self._local, "conn", None) is not conn:
+            raise sqlite3.ProgrammingError(
+                "Соединение выдано другому потоку или не этим пулом"
+            )
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with contextlib.suppress(sqlite3.Error):
+                conn.close()
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append((conn, threading.get_ident(), time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        """Закрыть все свободные соединения пула."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+
+        for conn, _, _ in idle:
+            with contextlib.suppress(sqlite3.Error):
+                conn.close()
+
+
+_pool = ConnectionPool()
+_read_pool = ConnectionPool(
+    max_size=DB_READ_POOL_MAX_SIZE,
+    on_connect=configure_read_connection,
+    read_only=True,
+)
+
+
+def get_pool() -> ConnectionPool:
+    """Получить общий пул соединений приложения."""
+    return _pool
+
+
+def get_read_pool() -> ConnectionPool:
+    """Получить пул соединений только для чтения (просмотр меню клиентом)."""
+    return _read_pool
+
+
+def acquire_connection() -> sqlite3.Connection:
+    """Получить соединение из общего пула.
+
+    Каждый вызов должен завершаться release_connection().
+
+    Returns:
+        Соединение с БД
+
+    Raises:
+        sqlite3.Error: При ошибке подключения к БД
+    """
+    return _pool.acquire()
+
+
+def release_connection(conn: sqlite3.Connection) -> None:
+    """Вернуть соединение в общий пул.
+
+    Args:
+        conn: Соединение, полученное через acquire_connection()
+
+    Raises:
+        sqlite3.ProgrammingError: Если соединение выдано другому потоку или не пулом
+    """
+    _pool.release(conn)
+
+
+# Глубина вложенности unit_of_work по id соединения
+_uow_lock = threading.Lock()
+_uow_depth: Dict[int, int] = {}
+
+
+def in_unit_of_work(conn: sqlite3.Connection) -> bool:
+    """Проверить, выполняется ли соединение внутри unit_of_work."""
+    return _uow_depth.get(id(conn), 0) > 0
+
+
+@contextlib.contextmanager
+def unit_of_work(
+    conn: sqlite3.Connection, immediate: bool = True
+) -> Generator[sqlite3.Connection, None, None]:
+    """Контекстный менеджер единой транзакции для группы операций.
+
+    Внутри блока вспомогательные функции записи не фиксируют транзакцию сами
+    (maybe_commit/maybe_rollback ничего не делают), а присоединяются к внешней.
+    Вложенные блоки также присоединяются к самому внешнему. В конце внешнего
+    блока выполняется один COMMIT, а при исключении — ROLLBACK.
+
+    Args:
+        conn: Соединение с БД
+        immediate: Сразу захватить блокировку записи (BEGIN IMMEDIATE). Иначе
+            транзакция, начавшаяся с чтения, в режиме WAL может получить
+            SQLITE_BUSY при попытке записи без ожидания busy_timeout
+
+    Yields:
+        То же соединение
+    """
+    key = id(conn)
+    with _uow_lock:
+        depth = _uow_depth.get(key, 0)
+        _uow_depth[key] = depth + 1
+
+    try:
+        if depth == 0 and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+        yield conn
+
+        if depth == 0:
+            conn.commit()
+
+    except BaseException:
+        if depth == 0:
+            with contextlib.suppress(sqlite3.Error):
+                conn.rollback()
+        raise
+
+    finally:
+        with _uow_lock:
+            if depth == 0:
+                del _uow_depth[key]
+            else:
+                _uow_depth[key] = depth
+
+
+def maybe_commit(conn: sqlite3.Connection) -> None:
+    """Зафиксировать транзакцию, если соединение не внутри unit_of_work."""
+    if not in_unit_of_work(conn):
+        conn.commit()
+
+
+def maybe_rollback(conn: sqlite3.Connection) -> None:
+    """Откатить транзакцию, если соединение не внутри unit_of_work.
+
+    Внутри unit_of_work откат выполняет внешний блок при выходе с исключением.
+    """
+    if not in_unit_of_work(conn):
+        conn.rollback()
+
+
+def report_connection_settings() -> str:
+    """Сформировать отчет о фактических параметрах соединений пула.
+
+    Returns:
+        Строка вида "journal_mode=wal, synchronous=1, ..."
+
+    Raises:
+        sqlite3.Error: При ошибке подключения к БД
+    """
+    conn = acquire_connection()
+    try:
+        settings = get_connection_settings(conn)
+    finally:
+        release_connection(conn)
+
+    return ", ".join(f"{name}={value}" for name, value in settings.items())
 
 
 @contextlib.contextmanager
 def get_connection() -> Generator[sqlite3.Connection, None, None]:
     """Контекстный менеджер для соединения с базой данных.
 
-    Создает соединение с БД, настраивает row_factory и автоматически закрывает соединение.
+    Берет соединение из пула и автоматически возвращает его обратно.
 
     Yields:
         Соединение с БД
@@ -23,8 +467,7 @@ def get_connection() -> Generator[sqlite3.Connection, None, None]:
     """
     conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
+        conn = acquire_connection()
         yield conn
 
     except sqlite3.Error as error:
@@ -32,8 +475,31 @@ def get_connection() -> Generator[sqlite3.Connection, None, None]:
 
     finally:
         if conn:
-            try:
-                conn.close()
-            except sqlite3.Error:
-                # Игнорируем ошибки при закрытии соединения
-                pass
+            release_connection(conn)
+
+
+@contextlib.contextmanager
+def get_read_connection() -> Generator[sqlite3.Connection, None, None]:
+    """Контекстный менеджер для соединения только для чтения.
+
+    Берет соединение из отдельного пула только для чтения. В режиме WAL
+    читатели работают со снимком БД и не ждут пишущего, поэтому такие
+    соединения не конкурируют с операциями администратора и заказами.
+
+    Yields:
+        Соединение с БД только для чтения
+
+    Raises:
+        sqlite3.Error: При ошибке подключения к БД
+    """
+    conn = None
+    try:
+        conn = _read_pool.acquire()
+        yield conn
+
+    except sqlite3.Error as error:
+        raise sqlite3.Error(f"Ошибка подключения к базе данных: {error}")
+
+    finally:
+        if conn:
+            _read_pool.release(conn)
@@ -0,0 +1,204 @@
+# app/db/journal.py
+
+"""Модуль журнала заказов с фоновой записью в базу данных порциями."""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from app.core.config import (
+    ORDER_JOURNAL_BATCH_SIZE,
+    ORDER_JOURNAL_ENABLED,
+    ORDER_JOURNAL_FLUSH_INTERVAL,
+    ORDER_JOURNAL_PUT_TIMEOUT,
+    ORDER_JOURNAL_QUEUE_SIZE,
+)
+from app.core.metrics import (
+    ORDER_JOURNAL_DROPPED,
+    ORDER_JOURNAL_QUEUE,
+    ORDER_JOURNAL_WRITTEN,
+    Sample,
+)
+from app.core.models import OrderRecord
+from app.db.connection import get_connection, unit_of_work
+from app.db.queries import write_orders
+
+# Метка конца работы для фонового потока
+_STOP = object()
+
+
+class OrderJournal:
+    """Журнал заказов с записью в БД фоновым потоком.
+
+    Операции заказа только кладут запись в ограниченную очередь в памяти и не
+    ждут записи на диск. Фоновый поток забирает записи порциями (до batch_size
+    штук или раз в flush_interval секунд) и пишет каждую порцию одной
+    транзакцией, то есть одним fsync на порцию вместо fsync на каждый заказ.
+
+    Если очередь заполнена дольше put_timeout секунд, запись отбрасывается и
+    учитывается в метрике pizza_order_journal_dropped_total. Записи, которые
+    не удалось сохранить из-за ошибки БД, учитываются там же.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ORDER_JOURNAL_ENABLED,
+        queue_size: int = ORDER_JOURNAL_QUEUE_SIZE,
+        batch_size: int = ORDER_JOURNAL_BATCH_SIZE,
+        flush_interval: float = ORDER_JOURNAL_FLUSH_INTERVAL,
+        put_timeout: float = ORDER_JOURNAL_PUT_TIMEOUT,
+    ) -> None:
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError(
+                "Размер очереди и порции журнала должен быть положительным"
+            )
+
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue: "queue.Queue[object]" = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Число вызовов record, которые уже проверили _closed и кладут запись
+        self._putting = 0
+
+    @property
+    def pending(self) -> int:
+        """Число записей, ожидающих записи в БД."""
+        return self._queue.qsize()
+
+    def _ensure_started(self) -> None:
+        """Запустить фоновый поток при первой записи."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="order-journal", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def record(self, lines: List[Tuple[int, int, Optional[float]]]) -> bool:
+        """Поставить заказ в очередь на запись в журнал.
+
+        Args:
+            lines: Строки заказа (ID пиццы, количество, цена на момент заказа)
+
+        Returns:
+            True если запись поставлена в очередь, False если журнал
+            выключен, закрыт или очередь переполнена
+        """
+        if not self.enabled or not lines:
+            return False
+
+        # Проверка и постановка в очередь атомарны относительно close():
+        # метка остановки ставится только после завершения начатых record
+        with self._lock:
+            if self._closed:
+                return False
+            self._putting += 1
+
+        try:
+            self._ensure_started()
+            self._queue.put(
+                OrderRecord(time.time(), list(lines)), timeout=self.put_timeout
+            )
+            return True
+        except queue.Full:
+            ORDER_JOURNAL_DROPPED.labels("queue_full").inc()
+            return False
+        finally:
+            with self._lock:
+                self._putting -= 1
+                if not self._putting:
+                    self._idle.notify_all()
+
+    def _next_batch(self) -> Tuple[List[OrderRecord], bool]:
+        """Дождаться записей и собрать порцию.
+
+        Returns:
+            Кортеж (порция, получен ли сигнал остановки)
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _write(self, batch: List[OrderRecord]) -> None:
+        """Записать порцию одной транзакцией."""
+        try:
+            with get_connection() as conn, unit_of_work(conn):
+                write_orders(batch, conn)
+            ORDER_JOURNAL_WRITTEN.inc(len(batch))
+        except sqlite3.Error:
+            ORDER_JOURNAL_DROPPED.labels("write_error").inc(len(batch))
+
+    def _run(self) -> None:
+        """Цикл фонового потока записи."""
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Дождаться записи в БД всех поставленных в очередь заказов."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Записать оставшиеся заказы и остановить фоновый поток.
+
+        После закрытия новые заказы в журнал не попадают.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._idle.wait_for(lambda: not self._putting)
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+
+_journal = OrderJournal()
+
+
+def _journal_queue_size() -> Iterator[Sample]:
+    """Размер очереди журнала для метрики pizza_order_journal_queue."""
+    yield (), _journal.pending
+
+
+ORDER_JOURNAL_QUEUE.collector = _journal_queue_size
+
+
+def get_order_journal() -> OrderJournal:
+    """Получить общий журнал заказов приложения."""
+    return _journal
@@ -2,36 +2,39 @@
 
 """Модуль, содержащий SQL-запросы для выполнения различных операций с базой данных."""
 
+import json
 import sqlite3
-from typing import List, Tuple, Optional
-
-from app.core.config import DB_PATH
+from typing import Dict, Iterable, List, Set, Tuple, Optional
+
+from app.db.connection import (
+    acquire_connection,
+    maybe_commit,
+    maybe_rollback,
+    release_connection,
+)
 from app.core.models import *
 
 
 def ensure_connection(
     conn: Optional[sqlite3.Connection] = None,
 ) -> Tuple[sqlite3.Connection, bool]:
-    """Проверяет соединение и при необходимости создает новое.
+    """Проверяет соединение и при необходимости берет новое из пула.
 
     Args:
         conn: Соединение для проверки
 
     Returns:
-        Tuple[sqlite3.Connection, bool]: (соединение, флаг необходимости закрытия)
+        Tuple[sqlite3.Connection, bool]: (соединение, флаг необходимости освобождения)
     """
     if conn is None:
-        new_conn = sqlite3.connect(DB_PATH)
-        new_conn.row_factory = sqlite3.Row
-        return new_conn, True
+        return acquire_connection(), True
 
     try:
-        conn.execute("SELECT 1").fetchone()
+        # Закрытое соединение отвергает обращение без запроса к БД
+        conn.total_changes
         return conn, False
     except (sqlite3.Error, AttributeError):
-        new_conn = sqlite3.connect(DB_PATH)
-        new_conn.row_factory = sqlite3.Row
-        return new_conn, True
+        return acquire_connection(), True
 
 
 # ---------------- PIZZA ----------------
@@ -55,11 +58,21 @@ SQL_UPDATE_PIZZA_VISIBILITY = """
                               SET is_visible = ?
                               WHERE id_pizza = ?;
                               """
+SQL_UPDATE_PIZZA_HIDDEN = """
+                          UPDATE pizza
+                          SET is_hidden = ?, is_visible = ?
+                          WHERE id_pizza = ?;
+                          """
 SQL_DELETE_PIZZA = """
                    DELETE
                    FROM pizza
                    WHERE id_pizza = ?;
                    """
+SQL_DELETE_PIZZA_COST = """
+                        DELETE
+                        FROM pizza_cost
+                        WHERE id_pizza = ?;
+                        """
 
 
 def get_all_pizzas(conn: Optional[sqlite3.Connection] = None) -> List[Pizza]:
@@ -82,13 +95,13 @@ def get_all_pizzas(conn: Optional[sqlite3.Connection] = None) -> List[Pizza]:
             result = [Pizza(**row) for row in rows]
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении всех пицц: {error}")
 
     except Exception as error:
@@ -118,13 +131,13 @@ def get_pizza_by_id(
             result = Pizza(**row) if row else None
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении пиццы по ID: {error}")
 
     except Exception as error:
@@ -152,17 +165,17 @@ def create_pizza(
 
         try:
             cur = conn.execute(SQL_INSERT_PIZZA, (name, int(visible)))
-            conn.commit()
+            maybe_commit(conn)
             result = cur.lastrowid
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при создании пиццы: {error}")
 
     except Exception as error:
@@ -187,20 +200,58 @@ def update_pizza_visibility(
 
         try:
             conn.execute(SQL_UPDATE_PIZZA_VISIBILITY, (int(visible), pizza_id))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при обновлении видимости пиццы: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
+def set_pizza_hidden(
+    pizza_id: int, hidden: bool, conn: Optional[sqlite3.Connection] = None
+) -> None:
+    """Скрыть пиццу вручную или снять ручное скрытие.
+
+    Скрытая вручную пицца невидима и не участвует в пересчете видимости
+    по остаткам склада. При снятии скрытия пицца становится видимой;
+    наличие ингредиентов нужно пересчитать отдельно.
+
+    Args:
+        pizza_id: Идентификатор пиццы
+        hidden: True - скрыть пиццу, False - снять скрытие
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            conn.execute(
+                SQL_UPDATE_PIZZA_HIDDEN, (int(hidden), int(not hidden), pizza_id)
+            )
+            maybe_commit(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при скрытии пиццы: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
 def delete_pizza(pizza_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
     """Удалить пиццу.
 
@@ -215,15 +266,17 @@ def delete_pizza(pizza_id: int, conn: Optional[sqlite3.Connection] = None) -> No
         conn, need_to_close = ensure_connection(conn)
 
         try:
+            # Зависимые строки удаляются первыми из-за внешних ключей
+            conn.execute(SQL_DELETE_PIZZA_COST, (pizza_id,))
             conn.execute(SQL_DELETE_PIZZA, (pizza_id,))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при удалении пиццы: {error}")
 
     except Exception as error:
@@ -241,6 +294,16 @@ SQL_UPSERT_PIZZA_COST = """
     INSERT OR REPLACE INTO pizza_cost(id_pizza, cost_factor)
     VALUES (?, ?);
 """
+SQL_SELECT_PIZZA_PRICE = """
+    SELECT price
+    FROM pizza_price
+    WHERE id_pizza = ?;
+"""
+SQL_SELECT_PIZZA_PRICES = """
+    SELECT id_pizza, price
+    FROM pizza_price
+    WHERE id_pizza IN (SELECT value FROM json_each(?));
+"""
 SQL_GET_PIZZA_BASE_COST = """
     SELECT ic.cost, r.amount
     FROM recipe r
@@ -254,6 +317,10 @@ def get_pizza_cost(
 ) -> Optional[float]:
     """Получить полную стоимость пиццы с учетом множителя.
 
+    Цена читается по первичному ключу из таблицы pizza_price, которую
+    триггеры пересчитывают при изменении рецепта, множителя или стоимости
+    ингредиентов.
+
     Args:
         pizza_id: Идентификатор пиццы
         conn: Соединение с базой данных. Если None или невалидное - создается новое.
@@ -268,23 +335,58 @@ def get_pizza_cost(
         conn, need_to_close = ensure_connection(conn)
 
         try:
-            if get_pizza_by_id(pizza_id, conn) is None:
-                return None
+            row = conn.execute(SQL_SELECT_PIZZA_PRICE, (pizza_id,)).fetchone()
+            result = row["price"] if row else None
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении стоимости пиццы: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def get_pizza_prices(
+    pizza_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None
+) -> Dict[int, Optional[float]]:
+    """Получить цены нескольких пицц одним запросом.
 
-            base_cost = get_pizza_base_cost(pizza_id, conn)
-            row = conn.execute(SQL_SELECT_PIZZA_COST, (pizza_id,)).fetchone()
+    Args:
+        pizza_ids: Идентификаторы пицц
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Словарь {ID пиццы: цена}; пиццы без цены в результат не попадают
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    ids = sorted(set(pizza_ids))
+    if not ids:
+        return {}
 
-            result = base_cost * row["cost_factor"] if row else None
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(SQL_SELECT_PIZZA_PRICES, (json.dumps(ids),))
+            result = {row["id_pizza"]: row["price"] for row in rows}
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
-            raise sqlite3.Error(f"Ошибка при получении стоимости пиццы: {error}")
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении стоимости пицц: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
@@ -304,21 +406,23 @@ def set_pizza_cost(
         sqlite3.Error: При ошибке работы с БД
     """
     try:
+        # Проверяем до получения соединения, чтобы не занимать его зря;
+        # ошибка, как и прежде, оборачивается в sqlite3.Error
+        if cost_factor < 0:
+            raise ValueError("Множитель стоимости не может быть отрицательным")
+
         conn, need_to_close = ensure_connection(conn)
 
         try:
-            if cost_factor < 0:
-                raise ValueError("Множитель стоимости не может быть отрицательным")
-
             conn.execute(SQL_UPSERT_PIZZA_COST, (pizza_id, cost_factor))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при установке стоимости пиццы: {error}")
 
     except Exception as error:
@@ -353,19 +457,255 @@ def get_pizza_base_cost(
             base_cost = sum(cost * amount for cost, amount in result)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return base_cost
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при расчёте себестоимости пиццы: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
+# ---------------- CATALOG VERSION ----------------
+
+SQL_SELECT_CATALOG_VERSION = """
+    SELECT version
+    FROM catalog_version
+    WHERE id = 1;
+"""
+
+
+def get_catalog_version(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Получить номер версии каталога (меню, рецептов и цен).
+
+    Номер увеличивается триггерами при любой записи в таблицы каталога,
+    поэтому по нему можно дешево проверять актуальность кэша.
+
+    Args:
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Номер версии каталога
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            row = conn.execute(SQL_SELECT_CATALOG_VERSION).fetchone()
+            result = row["version"] if row else 0
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении версии каталога: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+# ---------------- MENU ----------------
+
+SQL_SELECT_MENU = """
+    SELECT p.id_pizza, p.name_pizza, p.is_visible, pp.price
+    FROM pizza p
+    JOIN pizza_price pp ON pp.id_pizza = p.id_pizza
+    WHERE p.is_visible = 1
+    ORDER BY p.id_pizza;
+"""
+
+
+def get_menu(conn: Optional[sqlite3.Connection] = None) -> List[Tuple[Pizza, float]]:
+    """Получить видимые пиццы вместе с ценами одним запросом.
+
+    Цены берутся из материализованной таблицы pizza_price, поэтому запрос
+    не агрегирует рецепты. Пиццы без множителя стоимости в меню не попадают.
+
+    Args:
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Список кортежей (пицца, цена)
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(SQL_SELECT_MENU).fetchall()
+            result = [
+                (
+                    Pizza(row["id_pizza"], row["name_pizza"], row["is_visible"]),
+                    float(row["price"]),
+                )
+                for row in rows
+            ]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении меню: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+SQL_SELECT_PIZZA_WITH_RECIPE = """
+    SELECT p.id_pizza,
+           p.name_pizza,
+           p.is_visible,
+           pp.price,
+           i.id_ingredient,
+           i.name_ingredient,
+           r.amount
+    FROM pizza p
+    LEFT JOIN pizza_price pp ON pp.id_pizza = p.id_pizza
+    LEFT JOIN recipe r ON r.id_pizza = p.id_pizza
+    LEFT JOIN ingredient i ON i.id_ingredient = r.id_ingredient
+    WHERE p.id_pizza = ?
+    ORDER BY r.id_ingredient;
+"""
+
+
+def get_pizza_with_recipe(
+    pizza_id: int, conn: Optional[sqlite3.Connection] = None
+) -> Optional[Tuple[Pizza, List[Tuple[Ingredient, int]], Optional[float]]]:
+    """Получить пиццу, ее состав и цену одним запросом.
+
+    Пицца соединяется с материализованной ценой, рецептом и названиями
+    ингредиентов, поэтому число запросов не зависит от размера рецепта.
+
+    Args:
+        pizza_id: Идентификатор пиццы
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Кортеж (пицца, список пар (ингредиент, количество), цена) или None,
+        если пицца не найдена. Цена None, если у пиццы нет множителя стоимости.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(SQL_SELECT_PIZZA_WITH_RECIPE, (pizza_id,)).fetchall()
+
+            result = None
+            if rows:
+                first = rows[0]
+                pizza = Pizza(
+                    first["id_pizza"], first["name_pizza"], first["is_visible"]
+                )
+                ingredients = [
+                    (
+                        Ingredient(row["id_ingredient"], row["name_ingredient"]),
+                        row["amount"],
+                    )
+                    for row in rows
+                    if row["id_ingredient"] is not None
+                ]
+                result = pizza, ingredients, first["price"]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении состава пиццы: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+# ---------------- CAPACITY ----------------
+
+# Сколько порций каждой пиццы можно приготовить из текущих остатков:
+# минимум по рецепту от остаток // количество_в_рецепте.
+# Пицца без рецепта недоступна (0), строки с нулевым количеством не ограничивают.
+SQL_SELECT_PIZZA_CAPACITY = """
+    SELECT p.id_pizza,
+           p.name_pizza,
+           p.is_visible,
+           CASE
+               WHEN COUNT(r.id_ingredient) = 0 THEN 0
+               ELSE MIN(COALESCE(ia.amount, 0) / NULLIF(r.amount, 0))
+           END AS capacity
+    FROM pizza p
+    LEFT JOIN recipe r ON r.id_pizza = p.id_pizza
+    LEFT JOIN ingredient_amount ia ON ia.id_ingredient = r.id_ingredient
+    GROUP BY p.id_pizza
+    ORDER BY p.id_pizza;
+"""
+
+
+def get_pizza_capacities(
+    conn: Optional[sqlite3.Connection] = None,
+) -> List[Tuple[Pizza, Optional[int]]]:
+    """Рассчитать максимальное количество каждой пиццы, которое можно приготовить.
+
+    Расчет выполняется одним агрегирующим запросом по всем пиццам сразу:
+    рецепты и остатки читаются один раз, без запросов на каждый ингредиент.
+
+    Args:
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Список кортежей (пицца, количество). Количество None означает, что
+        остатки его не ограничивают (все строки рецепта с нулевым количеством).
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(SQL_SELECT_PIZZA_CAPACITY).fetchall()
+            result = [
+                (
+                    Pizza(row["id_pizza"], row["name_pizza"], row["is_visible"]),
+                    row["capacity"],
+                )
+                for row in rows
+            ]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при расчете количества пицц: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
 # ---------------- INGREDIENT ----------------
 
 SQL_SELECT_ALL_INGREDIENTS = """
@@ -386,6 +726,21 @@ SQL_DELETE_INGREDIENT = """
                         FROM ingredient
                         WHERE id_ingredient = ?;
                         """
+SQL_SELECT_EXISTING_INGREDIENT_IDS = """
+    SELECT id_ingredient
+    FROM ingredient
+    WHERE id_ingredient IN (SELECT value FROM json_each(?));
+"""
+SQL_DELETE_INGREDIENT_COST = """
+                             DELETE
+                             FROM ingredient_cost
+                             WHERE id_ingredient = ?;
+                             """
+SQL_DELETE_INGREDIENT_AMOUNT = """
+                               DELETE
+                               FROM ingredient_amount
+                               WHERE id_ingredient = ?;
+                               """
 
 
 def get_all_ingredients(conn: Optional[sqlite3.Connection] = None) -> List[Ingredient]:
@@ -408,13 +763,13 @@ def get_all_ingredients(conn: Optional[sqlite3.Connection] = None) -> List[Ingre
             result = [Ingredient(**row) for row in rows]
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении всех ингредиентов: {error}")
 
     except Exception as error:
@@ -444,19 +799,58 @@ def get_ingredient_by_id(
             result = Ingredient(**row) if row else None
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении ингредиента по ID: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
+def get_existing_ingredient_ids(
+    ingredient_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None
+) -> Set[int]:
+    """Проверить одним запросом, какие из ингредиентов существуют.
+
+    Args:
+        ingredient_ids: Идентификаторы ингредиентов для проверки
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Множество ID существующих ингредиентов
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            ids = sorted(set(ingredient_ids))
+            rows = conn.execute(
+                SQL_SELECT_EXISTING_INGREDIENT_IDS, (json.dumps(ids),)
+            ).fetchall()
+            result = {row["id_ingredient"] for row in rows}
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при проверке ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
 def create_ingredient(name: str, conn: Optional[sqlite3.Connection] = None) -> int:
     """Добавить новый ингредиент.
 
@@ -475,17 +869,17 @@ def create_ingredient(name: str, conn: Optional[sqlite3.Connection] = None) -> i
 
         try:
             cur = conn.execute(SQL_INSERT_INGREDIENT, (name,))
-            conn.commit()
+            maybe_commit(conn)
             result = cur.lastrowid
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при создании ингредиента: {error}")
 
     except Exception as error:
@@ -508,15 +902,18 @@ def delete_ingredient(
         conn, need_to_close = ensure_connection(conn)
 
         try:
+            # Зависимые строки удаляются первыми из-за внешних ключей
+            conn.execute(SQL_DELETE_INGREDIENT_COST, (ingredient_id,))
+            conn.execute(SQL_DELETE_INGREDIENT_AMOUNT, (ingredient_id,))
             conn.execute(SQL_DELETE_INGREDIENT, (ingredient_id,))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при удалении ингредиента: {error}")
 
     except Exception as error:
@@ -559,13 +956,13 @@ def get_ingredient_cost(
             result = IngredientCost(**row) if row else None
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении стоимости ингредиента: {error}")
 
     except Exception as error:
@@ -594,14 +991,14 @@ def set_ingredient_cost(
 
         try:
             conn.execute(SQL_UPSERT_INGREDIENT_COST, (ingredient_id, cost))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при установке стоимости ингредиента: {error}")
 
     except Exception as error:
@@ -619,6 +1016,24 @@ SQL_UPSERT_INGREDIENT_AMOUNT = """
     INSERT OR REPLACE INTO ingredient_amount(id_ingredient, amount)
     VALUES (?, ?);
 """
+SQL_ADD_INGREDIENT_AMOUNT = """
+    INSERT INTO ingredient_amount(id_ingredient, amount)
+    VALUES (?, ?)
+    ON CONFLICT (id_ingredient) DO UPDATE SET amount = amount + excluded.amount;
+"""
+SQL_REFILL_ALL_INGREDIENT_AMOUNTS = """
+    INSERT INTO ingredient_amount(id_ingredient, amount)
+    SELECT id_ingredient, :amount
+    FROM ingredient
+    WHERE true
+    ON CONFLICT (id_ingredient) DO UPDATE SET amount = amount + excluded.amount;
+"""
+SQL_SELECT_STOCK_LEVELS = """
+    SELECT i.id_ingredient, i.name_ingredient, COALESCE(ia.amount, 0) AS amount
+    FROM ingredient i
+    LEFT JOIN ingredient_amount ia ON ia.id_ingredient = i.id_ingredient
+    ORDER BY i.id_ingredient;
+"""
 
 
 def get_ingredient_amount(
@@ -646,13 +1061,13 @@ def get_ingredient_amount(
             result = IngredientAmount(**row) if row else None
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении количества ингредиента: {error}")
 
     except Exception as error:
@@ -681,78 +1096,204 @@ def set_ingredient_amount(
 
         try:
             conn.execute(SQL_UPSERT_INGREDIENT_AMOUNT, (ingredient_id, amount))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при установке количества ингредиента: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
-def adjust_ingredient_amount(
-    ingredient_id: int, delta: int, conn: Optional[sqlite3.Connection] = None
+def add_ingredient_amounts(
+    deltas: List[Tuple[int, int]], conn: Optional[sqlite3.Connection] = None
 ) -> None:
-    """Изменить количество ингредиента на складе на заданную величину.
+    """Добавить количества к остаткам нескольких ингредиентов одним executemany.
+
+    Существование ингредиентов не проверяется.
 
     Args:
-        ingredient_id: Идентификатор ингредиента
-        delta: Величина изменения (положительная - добавление, отрицательная - уменьшение)
+        deltas: Список кортежей (id ингредиента, количество для добавления)
         conn: Соединение с базой данных. Если None или невалидное - создается новое.
 
     Raises:
         sqlite3.Error: При ошибке работы с БД
-        ValueError: Если после изменения количество станет отрицательным
+        ValueError: Если передано отрицательное количество
     """
+    if any(amount < 0 for _, amount in deltas):
+        raise ValueError("Количество для добавления не может быть отрицательным")
+
     try:
         conn, need_to_close = ensure_connection(conn)
 
         try:
-            # Получаем текущее количество
-            current = get_ingredient_amount(ingredient_id, conn)
-            if current is None:
-                new_amount = delta if delta > 0 else 0
-            else:
-                new_amount = current.amount + delta
-
-            if new_amount < 0:
-                raise ValueError("Количество ингредиента не может стать отрицательным")
-
-            # Устанавливаем новое количество
-            conn.execute(SQL_UPSERT_INGREDIENT_AMOUNT, (ingredient_id, new_amount))
-            conn.commit()
+            conn.executemany(SQL_ADD_INGREDIENT_AMOUNT, deltas)
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
+            maybe_rollback(conn)
             if need_to_close:
-                conn.close()
-            raise sqlite3.Error(f"Ошибка при изменении количества ингредиента: {error}")
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при пополнении ингредиентов: {error}")
 
     except Exception as error:
-        if isinstance(error, ValueError):
-            raise
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
-# ---------------- RECIPE ----------------
+def refill_ingredient_amounts(
+    amount: int, conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """Добавить количество к остатку каждого ингредиента одним запросом.
 
-SQL_SELECT_RECIPE_BY_PIZZA = """
-                             SELECT id_pizza, id_ingredient, amount
-                             FROM recipe
-                             WHERE id_pizza = ?;
-                             """
-SQL_UPSERT_RECIPE_ITEM = """
-    INSERT OR REPLACE INTO recipe(id_pizza, id_ingredient, amount)
-    VALUES (?, ?, ?);
-"""
-SQL_DELETE_RECIPE_BY_PIZZA = """
+    Ингредиенты без записи об остатке получают остаток, равный amount.
+
+    Args:
+        amount: Количество для добавления к каждому ингредиенту
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Количество обновленных или созданных записей
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+        ValueError: Если передано отрицательное количество
+    """
+    if amount < 0:
+        raise ValueError("Количество для добавления не может быть отрицательным")
+
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            cur = conn.execute(SQL_REFILL_ALL_INGREDIENT_AMOUNTS, {"amount": amount})
+            maybe_commit(conn)
+            result = cur.rowcount
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            maybe_rollback(conn)
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при пополнении ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def get_stock_levels(
+    conn: Optional[sqlite3.Connection] = None,
+) -> List[Tuple[Ingredient, int]]:
+    """Получить остатки всех ингредиентов одним запросом.
+
+    Args:
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Список кортежей (ингредиент, остаток). Ингредиенты без записи
+        об остатке получают 0.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(SQL_SELECT_STOCK_LEVELS).fetchall()
+            result = [
+                (
+                    Ingredient(row["id_ingredient"], row["name_ingredient"]),
+                    row["amount"],
+                )
+                for row in rows
+            ]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении остатков ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def adjust_ingredient_amount(
+    ingredient_id: int, delta: int, conn: Optional[sqlite3.Connection] = None
+) -> None:
+    """Изменить количество ингредиента на складе на заданную величину.
+
+    Args:
+        ingredient_id: Идентификатор ингредиента
+        delta: Величина изменения (положительная - добавление, отрицательная - уменьшение)
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+        ValueError: Если после изменения количество станет отрицательным
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            # Получаем текущее количество
+            current = get_ingredient_amount(ingredient_id, conn)
+            if current is None:
+                new_amount = delta if delta > 0 else 0
+            else:
+                new_amount = current.amount + delta
+
+            if new_amount < 0:
+                if need_to_close:
+                    release_connection(conn)
+                raise ValueError("Количество ингредиента не может стать отрицательным")
+
+            # Устанавливаем новое количество
+            conn.execute(SQL_UPSERT_INGREDIENT_AMOUNT, (ingredient_id, new_amount))
+            maybe_commit(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при изменении количества ингредиента: {error}")
+
+    except Exception as error:
+        if isinstance(error, ValueError):
+            raise
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+# ---------------- RECIPE ----------------
+
+SQL_SELECT_RECIPE_BY_PIZZA = """
+                             SELECT id_pizza, id_ingredient, amount
+                             FROM recipe
+                             WHERE id_pizza = ?;
+                             """
+SQL_UPSERT_RECIPE_ITEM = """
+    INSERT OR REPLACE INTO recipe(id_pizza, id_ingredient, amount)
+    VALUES (?, ?, ?);
+"""
+SQL_DELETE_RECIPE_BY_PIZZA = """
                              DELETE
                              FROM recipe
                              WHERE id_pizza = ?;
@@ -761,6 +1302,59 @@ SQL_SELECT_ALL_RECIPES = """
     SELECT id_pizza, id_ingredient, amount
     FROM recipe;
 """
+SQL_DEDUCT_RECIPE_INGREDIENTS = """
+    UPDATE ingredient_amount
+    SET amount = ingredient_amount.amount - r.amount
+    FROM recipe r
+    WHERE r.id_pizza = :pizza_id
+      AND ingredient_amount.id_ingredient = r.id_ingredient
+      AND NOT EXISTS (
+          SELECT 1
+          FROM recipe r2
+          LEFT JOIN ingredient_amount ia ON ia.id_ingredient = r2.id_ingredient
+          WHERE r2.id_pizza = :pizza_id
+            AND COALESCE(ia.amount, 0) < r2.amount
+      )
+    RETURNING ingredient_amount.id_ingredient, ingredient_amount.amount;
+"""
+# Ингредиенты, остатка которых не хватает на порцию хотя бы одного рецепта.
+# MAX(amount) по ингредиенту берется из индекса idx_recipe_ingredient
+SQL_SELECT_DEPLETED_INGREDIENTS = """
+    SELECT CAST(s.key AS INTEGER) AS id_ingredient
+    FROM json_each(?) s
+    WHERE s.value < (
+        SELECT MAX(r.amount)
+        FROM recipe r
+        WHERE r.id_ingredient = CAST(s.key AS INTEGER)
+    );
+"""
+SQL_SELECT_PIZZAS_BY_INGREDIENT = """
+    SELECT id_pizza
+    FROM recipe
+    WHERE id_ingredient = ?;
+"""
+SQL_SELECT_BASKET_STOCK = """
+    SELECT p.id_pizza,
+           p.is_visible,
+           r.id_ingredient,
+           r.amount,
+           COALESCE(ia.amount, 0) AS stock
+    FROM pizza p
+    LEFT JOIN recipe r ON r.id_pizza = p.id_pizza
+    LEFT JOIN ingredient_amount ia ON ia.id_ingredient = r.id_ingredient
+    WHERE p.id_pizza IN (SELECT value FROM json_each(?));
+"""
+SQL_DEDUCT_INGREDIENT_AMOUNT = """
+    UPDATE ingredient_amount
+    SET amount = amount - :demand
+    WHERE id_ingredient = :id_ingredient
+      AND amount >= :demand;
+"""
+SQL_COUNT_RECIPE_ITEMS = """
+    SELECT COUNT(*)
+    FROM recipe
+    WHERE id_pizza = ?;
+"""
 
 
 def get_recipe_for_pizza(
@@ -786,13 +1380,13 @@ def get_recipe_for_pizza(
             result = [Recipe(**row) for row in rows]
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении рецепта пиццы: {error}")
 
     except Exception as error:
@@ -828,20 +1422,23 @@ def upsert_recipe_item(
             pizza = get_pizza_by_id(pizza_id, conn)
             ingredient = get_ingredient_by_id(ingredient_id, conn)
 
+            if pizza is None or ingredient is None:
+                if need_to_close:
+                    release_connection(conn)
             if pizza is None:
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
             if ingredient is None:
                 raise ValueError(f"Ингредиент с ID {ingredient_id} не найден")
 
             conn.execute(SQL_UPSERT_RECIPE_ITEM, (pizza_id, ingredient_id, amount))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при обновлении рецепта: {error}")
 
     except Exception as error:
@@ -850,6 +1447,60 @@ def upsert_recipe_item(
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
+def write_recipe_items(
+    pizza_id: int,
+    ingredients: List[Tuple[int, int]],
+    replace: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+) -> None:
+    """Записать строки рецепта одной транзакцией.
+
+    Все строки записываются одним executemany; при replace=True старый рецепт
+    предварительно удаляется в той же транзакции. При ошибке изменения
+    откатываются целиком. Существование пиццы и ингредиентов не проверяется.
+
+    Args:
+        pizza_id: Идентификатор пиццы
+        ingredients: Список кортежей (id ингредиента, количество)
+        replace: Заменить существующий рецепт целиком
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+        ValueError: Если передано отрицательное количество
+    """
+    if any(amount < 0 for _, amount in ingredients):
+        raise ValueError("Количество ингредиента в рецепте не может быть отрицательным")
+
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            if replace:
+                conn.execute(SQL_DELETE_RECIPE_BY_PIZZA, (pizza_id,))
+
+            conn.executemany(
+                SQL_UPSERT_RECIPE_ITEM,
+                [
+                    (pizza_id, ingredient_id, amount)
+                    for ingredient_id, amount in ingredients
+                ],
+            )
+            maybe_commit(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+        except sqlite3.Error as error:
+            maybe_rollback(conn)
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при записи рецепта: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
 def delete_recipe_item(
     pizza_id: int, ingredient_id: int, conn: Optional[sqlite3.Connection] = None
 ) -> None:
@@ -871,14 +1522,14 @@ def delete_recipe_item(
                 "DELETE FROM recipe WHERE id_pizza = ? AND id_ingredient = ?",
                 (pizza_id, ingredient_id),
             )
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при удалении ингредиента из рецепта: {error}")
 
     except Exception as error:
@@ -902,17 +1553,19 @@ def delete_recipe_for_pizza(
 
         try:
             if get_pizza_by_id(pizza_id, conn) is None:
+                if need_to_close:
+                    release_connection(conn)
                 raise ValueError(f"Пицца с ID {pizza_id} не найдена")
 
             conn.execute(SQL_DELETE_RECIPE_BY_PIZZA, (pizza_id,))
-            conn.commit()
+            maybe_commit(conn)
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при удалении рецепта пиццы: {error}")
 
     except Exception as error:
@@ -943,22 +1596,262 @@ def check_recipe_ingredients_available(
             for item in recipe_items:
                 amount = get_ingredient_amount(item.id_ingredient, conn)
                 if amount is None or amount.amount < item.amount:
+                    if need_to_close:
+                        release_connection(conn)
                     return False
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return True
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при проверке наличия ингредиентов: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
+def get_basket_stock(
+    pizza_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None
+) -> Tuple[Dict[int, bool], Dict[int, List[Recipe]], Dict[int, int]]:
+    """Получить одним запросом рецепты пицц из корзины и остатки их ингредиентов.
+
+    Args:
+        pizza_ids: ID пицц из корзины
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Кортеж (видимость по ID пиццы, рецепт по ID пиццы, остаток по ID ингредиента).
+        Несуществующие пиццы в результат не попадают.
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            ids = sorted(set(pizza_ids))
+            rows = conn.execute(SQL_SELECT_BASKET_STOCK, (json.dumps(ids),)).fetchall()
+
+            visibility: Dict[int, bool] = {}
+            recipes: Dict[int, List[Recipe]] = {}
+            stock: Dict[int, int] = {}
+
+            for row in rows:
+                visibility[row["id_pizza"]] = bool(row["is_visible"])
+                items = recipes.setdefault(row["id_pizza"], [])
+                if row["id_ingredient"] is not None:
+                    items.append(
+                        Recipe(row["id_pizza"], row["id_ingredient"], row["amount"])
+                    )
+                    stock[row["id_ingredient"]] = row["stock"]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return visibility, recipes, stock
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при получении остатков для заказа: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def deduct_ingredient_amounts(
+    demand: Dict[int, int], conn: Optional[sqlite3.Connection] = None
+) -> bool:
+    """Списать со склада заданные количества ингредиентов в одной транзакции.
+
+    Каждая строка списывается только при достаточном остатке; если хотя бы
+    одного ингредиента не хватило, транзакция откатывается целиком
+    (внутри unit_of_work откат выполняет внешний блок).
+
+    Args:
+        demand: Словарь {ID ингредиента: количество к списанию}
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        True если списано все, False если какого-то ингредиента недостаточно
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            params = [
+                {"id_ingredient": ingredient_id, "demand": amount}
+                for ingredient_id, amount in demand.items()
+                if amount > 0
+            ]
+            cur = conn.executemany(SQL_DEDUCT_INGREDIENT_AMOUNT, params)
+            result = cur.rowcount == len(params)
+
+            if result:
+                maybe_commit(conn)
+            else:
+                maybe_rollback(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            maybe_rollback(conn)
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при списании ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def get_pizzas_with_ingredient(
+    ingredient_id: int, conn: Optional[sqlite3.Connection] = None
+) -> Set[int]:
+    """Найти все пиццы, в рецептах которых используется указанный ингредиент.
+
+    Поиск идет по индексу recipe(id_ingredient), без чтения всех рецептов.
+
+    Args:
+        ingredient_id: ID ингредиента
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Множество ID пицц, использующих данный ингредиент
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(
+                SQL_SELECT_PIZZAS_BY_INGREDIENT, (ingredient_id,)
+            ).fetchall()
+            result = {row["id_pizza"] for row in rows}
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при поиске пицц с ингредиентом: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def deduct_recipe_ingredients(
+    pizza_id: int, conn: Optional[sqlite3.Connection] = None
+) -> Optional[Dict[int, int]]:
+    """Атомарно списать со склада все ингредиенты рецепта пиццы.
+
+    Списание выполняется одним UPDATE, соединенным с рецептом: строки
+    изменяются только если остатка хватает для каждого ингредиента, поэтому
+    параллельные заказы не могут увести склад в минус.
+
+    Args:
+        pizza_id: Идентификатор пиццы
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Новые остатки списанных ингредиентов {ID ингредиента: остаток}
+        (пустой словарь для пустого рецепта) или None, если ингредиентов
+        недостаточно
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(
+                SQL_DEDUCT_RECIPE_INGREDIENTS, {"pizza_id": pizza_id}
+            ).fetchall()
+            result = {row["id_ingredient"]: row["amount"] for row in rows}
+
+            if not result:
+                # Ни одна строка не изменена: либо рецепт пуст, либо не хватает остатка
+                count = conn.execute(SQL_COUNT_RECIPE_ITEMS, (pizza_id,)).fetchone()[0]
+                result = {} if count == 0 else None
+
+            maybe_commit(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            maybe_rollback(conn)
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при списании ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+def get_depleted_ingredients(
+    stock: Dict[int, int], conn: Optional[sqlite3.Connection] = None
+) -> List[int]:
+    """Отобрать ингредиенты, остатка которых не хватает хотя бы одному рецепту.
+
+    После списания видимость может измениться только у пицц с такими
+    ингредиентами: если остаток не меньше самой большой порции ингредиента
+    среди всех рецептов, ни одна пицца из-за него не скрывается.
+
+    Args:
+        stock: Новые остатки {ID ингредиента: остаток}
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        ID ингредиентов, остаток которых меньше максимальной порции в рецептах
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    if not stock:
+        return []
+
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            rows = conn.execute(
+                SQL_SELECT_DEPLETED_INGREDIENTS, (json.dumps(stock),)
+            ).fetchall()
+            result = [row["id_ingredient"] for row in rows]
+
+            if need_to_close:
+                release_connection(conn)
+
+            return result
+
+        except sqlite3.Error as error:
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при проверке остатков ингредиентов: {error}")
+
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
 def get_all_recipes(conn: Optional[sqlite3.Connection] = None) -> List[Recipe]:
     """Получить все рецепты из базы данных.
 
@@ -979,28 +1872,43 @@ def get_all_recipes(conn: Optional[sqlite3.Connection] = None) -> List[Recipe]:
             result = [Recipe(**row) for row in rows]
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
 
             return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при получении всех рецептов: {error}")
 
     except Exception as error:
         raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
 
 
-# ---------------- ADDITION ----------------
-def update_pizzas_visibility_by_ingredients(
-    conn: Optional[sqlite3.Connection] = None,
-) -> None:
-    """Обновить видимость всех пицц на основе наличия ингредиентов.
+# ---------------- ORDERS ----------------
+
+SQL_INSERT_ORDER = """
+    INSERT INTO orders (created_at)
+    VALUES (?);
+"""
+# Цена строки передается из записи журнала: она читается в транзакции заказа
+SQL_INSERT_ORDER_LINE = """
+    INSERT INTO order_lines (id_order, line_no, id_pizza, quantity, price)
+    VALUES (?, ?, ?, ?, ?);
+"""
 
-    Проверяет наличие всех необходимых ингредиентов для каждой пиццы.
-    Если хотя бы одного ингредиента из рецепта нет на складе (количество = 0),
-    пицца становится невидимой для клиентов.
+
+def write_orders(
+    orders: Iterable[OrderRecord], conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """Записать заказы в журнал одной транзакцией.
+
+    Args:
+        orders: Записи заказов
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Количество записанных заказов
 
     Raises:
         sqlite3.Error: При ошибке работы с БД
@@ -1009,42 +1917,155 @@ def update_pizzas_visibility_by_ingredients(
         conn, need_to_close = ensure_connection(conn)
 
         try:
-            # Получаем все ингредиенты с нулевым количеством
-            all_ingredients = get_all_ingredients(conn)
-            zero_ingredients = set()
+            count = 0
+            lines = []
+            for order in orders:
+                order_id = conn.execute(SQL_INSERT_ORDER, (order.created_at,)).lastrowid
+                lines.extend(
+                    (order_id, line_no, pizza_id, quantity, price)
+                    for line_no, (pizza_id, quantity, price) in enumerate(
+                        order.lines, 1
+                    )
+                )
+                count += 1
+
+            conn.executemany(SQL_INSERT_ORDER_LINE, lines)
+            maybe_commit(conn)
+
+            if need_to_close:
+                release_connection(conn)
+
+            return count
+
+        except sqlite3.Error as error:
+            maybe_rollback(conn)
+            if need_to_close:
+                release_connection(conn)
+            raise sqlite3.Error(f"Ошибка при записи журнала заказов: {error}")
 
-            for ingredient in all_ingredients:
-                amount = get_ingredient_amount(ingredient.id_ingredient, conn)
-                if amount is None or amount.amount == 0:
-                    zero_ingredients.add(ingredient.id_ingredient)
+    except Exception as error:
+        raise sqlite3.Error(f"Ошибка при работе с БД: {error}")
+
+
+# ---------------- ADDITION ----------------
+
+# Пицца доступна, если каждого ингредиента рецепта хватает на одну порцию.
+# Скрытые администратором пиццы и пиццы без рецепта не пересчитываются.
+# {filter} ограничивает пересчет затронутыми пиццами, UPDATE трогает только
+# строки, у которых видимость действительно меняется.
+SQL_UPDATE_VISIBILITY_TEMPLATE = """
+    UPDATE pizza
+    SET is_visible = a.available
+    FROM (
+        SELECT p.id_pizza,
+               MIN(COALESCE(ia.amount, 0) >= r.amount) AS available
+        FROM pizza p
+        JOIN recipe r ON r.id_pizza = p.id_pizza
+        LEFT JOIN ingredient_amount ia ON ia.id_ingredient = r.id_ingredient
+        WHERE NOT p.is_hidden
+          AND {filter}
+        GROUP BY p.id_pizza
+    ) AS a
+    WHERE pizza.id_pizza = a.id_pizza
+      AND pizza.is_visible IS NOT a.available;
+"""
+SQL_UPDATE_VISIBILITY_ALL = SQL_UPDATE_VISIBILITY_TEMPLATE.format(filter="1")
+SQL_UPDATE_VISIBILITY_BY_INGREDIENTS = SQL_UPDATE_VISIBILITY_TEMPLATE.format(
+    filter="""p.id_pizza IN (
+            SELECT id_pizza
+            FROM recipe
+            WHERE id_ingredient IN (SELECT value FROM json_each(?))
+        )"""
+)
+SQL_UPDATE_VISIBILITY_BY_PIZZAS = SQL_UPDATE_VISIBILITY_TEMPLATE.format(
+    filter="p.id_pizza IN (SELECT value FROM json_each(?))"
+)
+
+
+def update_pizzas_visibility_by_ingredients(
+    ingredient_ids: Optional[Iterable[int]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """Пересчитать видимость пицц на основе наличия ингредиентов.
 
-            if not zero_ingredients:
-                return
+    Пицца видима, если каждого ингредиента ее рецепта на складе хватает
+    хотя бы на одну порцию; иначе она скрывается. Пересчет работает в обе стороны:
+    после пополнения склада скрытые пиццы снова становятся видимыми. Пиццы,
+    скрытые администратором (set_pizza_hidden), и пиццы без рецепта
+    не пересчитываются и сохраняют текущую видимость.
 
-            # Получаем все пиццы
-            all_pizzas = get_all_pizzas(conn)
+    Если переданы ingredient_ids, пересчитываются только пиццы, в рецептах
+    которых есть эти ингредиенты (обратный индекс ингредиент -> пицца),
+    иначе пересчитываются все пиццы. Изменения применяются одним UPDATE.
 
-            # Проверяем каждую пиццу
-            for pizza in all_pizzas:
-                recipe = get_recipe_for_pizza(pizza.id_pizza, conn)
-                should_be_visible = True
+    Args:
+        ingredient_ids: ID ингредиентов, остаток которых изменился, или None
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
 
-                # Если хотя бы один ингредиент с нулевым количеством, скрываем пиццу
-                for item in recipe:
-                    if item.id_ingredient in zero_ingredients:
-                        should_be_visible = False
-                        break
+    Returns:
+        Количество пицц, у которых изменилась видимость
 
-                # Обновляем видимость если нужно
-                if pizza.is_visible != should_be_visible:
-                    update_pizza_visibility(pizza.id_pizza, should_be_visible, conn)
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    if ingredient_ids is None:
+        return _update_pizzas_visibility(SQL_UPDATE_VISIBILITY_ALL, (), conn)
+
+    ids = sorted(set(ingredient_ids))
+    if not ids:
+        return 0
+
+    return _update_pizzas_visibility(
+        SQL_UPDATE_VISIBILITY_BY_INGREDIENTS, (json.dumps(ids),), conn
+    )
+
+
+def update_pizzas_visibility_by_pizzas(
+    pizza_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """Пересчитать видимость указанных пицц (например, после изменения рецепта).
+
+    Пиццы, скрытые администратором, и пиццы без рецепта не пересчитываются.
+
+    Args:
+        pizza_ids: ID пицц для пересчета
+        conn: Соединение с базой данных. Если None или невалидное - создается новое.
+
+    Returns:
+        Количество пицц, у которых изменилась видимость
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    ids = sorted(set(pizza_ids))
+    if not ids:
+        return 0
+
+    return _update_pizzas_visibility(
+        SQL_UPDATE_VISIBILITY_BY_PIZZAS, (json.dumps(ids),), conn
+    )
+
+
+def _update_pizzas_visibility(
+    query: str, params: Tuple, conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """Выполнить пакетный пересчет видимости пицц."""
+    try:
+        conn, need_to_close = ensure_connection(conn)
+
+        try:
+            cur = conn.execute(query, params)
+            maybe_commit(conn)
+            result = cur.rowcount
 
             if need_to_close:
-                conn.close()
+                release_connection(conn)
+
+            return result
 
         except sqlite3.Error as error:
             if need_to_close:
-                conn.close()
+                release_connection(conn)
             raise sqlite3.Error(f"Ошибка при обновлении видимости пицц: {error}")
 
     except Exception as error:
@@ -3,6 +3,7 @@
 """Модуль, содержащий SQL-запросы для создания и инициализации схемы базы данных (таблицы, индексы и т.п.)."""
 
 import sqlite3
+from typing import List, Tuple
 
 CREATE_PIZZA_TABLE = """
                      CREATE TABLE IF NOT EXISTS pizza (
@@ -55,6 +56,10 @@ CREATE_RECIPE_TABLE = """
                       """
 
 DROP_TABLES_QUERIES = [
+    "DROP TABLE IF EXISTS order_lines",
+    "DROP TABLE IF EXISTS orders",
+    "DROP TABLE IF EXISTS pizza_price",
+    "DROP TABLE IF EXISTS catalog_version",
     "DROP TABLE IF EXISTS recipe",
     "DROP TABLE IF EXISTS ingredient_amount",
     "DROP TABLE IF EXISTS ingredient_cost",
@@ -62,6 +67,7 @@ DROP_TABLES_QUERIES = [
     "DROP TABLE IF EXISTS pizza_cost",
     "DROP TABLE IF EXISTS pizza",
     "DROP TABLE IF EXISTS sqlite_sequence",
+    "PRAGMA user_version = 0",
 ]
 
 CREATE_TABLES_QUERIES = [
@@ -74,6 +80,279 @@ CREATE_TABLES_QUERIES = [
 ]
 
 
+# ---------------- MIGRATIONS ----------------
+
+# Миграция 1: рецепт без rowid (кластеризация по (id_pizza, id_ingredient)),
+# индекс для обратного поиска пицц по ингредиенту и покрывающий индекс меню
+MIGRATION_1 = [
+    """
+    CREATE TABLE recipe_new (
+        id_pizza INTEGER NOT NULL,
+        id_ingredient INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        FOREIGN KEY (id_pizza) REFERENCES pizza (id_pizza),
+        FOREIGN KEY (id_ingredient) REFERENCES ingredient (id_ingredient),
+        PRIMARY KEY (id_pizza, id_ingredient)
+    ) WITHOUT ROWID;
+    """,
+    """
+    INSERT INTO recipe_new (id_pizza, id_ingredient, amount)
+    SELECT id_pizza, id_ingredient, amount
+    FROM recipe;
+    """,
+    "DROP TABLE recipe;",
+    "ALTER TABLE recipe_new RENAME TO recipe;",
+    """
+    CREATE INDEX IF NOT EXISTS idx_recipe_ingredient
+        ON recipe (id_ingredient, amount);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_pizza_visible
+        ON pizza (is_visible, name_pizza);
+    """,
+]
+
+# Таблицы, изменение которых меняет меню, состав или цены пицц
+CATALOG_TABLES = ("pizza", "pizza_cost", "ingredient", "ingredient_cost", "recipe")
+
+CATALOG_VERSION_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event_name}_catalog_version
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+    END;
+"""
+
+# Миграция 2: счетчик изменений каталога, который триггеры увеличивают при любой
+# записи в таблицы каталога (в том числе из других процессов)
+MIGRATION_2 = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    """,
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);",
+]
+MIGRATION_2 += [
+    CATALOG_VERSION_TRIGGER.format(table=table, event=event, event_name=event.lower())
+    for table in CATALOG_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+# Пересчет цен пицц, выбранных условием {filter}:
+# сумма стоимость * количество по рецепту, умноженная на множитель стоимости.
+# Цена хранится только для пицц с множителем стоимости (как и в меню).
+PIZZA_PRICE_REFRESH = """
+    INSERT INTO pizza_price (id_pizza, price)
+    SELECT pc.id_pizza,
+           COALESCE((
+               SELECT SUM(ic.cost * r.amount)
+               FROM recipe r
+               JOIN ingredient_cost ic ON ic.id_ingredient = r.id_ingredient
+               WHERE r.id_pizza = pc.id_pizza
+           ), 0) * pc.cost_factor
+    FROM pizza_cost pc
+    WHERE {filter}
+    ON CONFLICT (id_pizza) DO UPDATE SET price = excluded.price;
+"""
+
+PIZZA_PRICE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event_name}_pizza_price
+    AFTER {event} ON {table}
+    BEGIN
+        {body}
+    END;
+"""
+
+# Что пересчитывать при изменении каждой таблицы: пицца NEW/OLD или все пиццы
+# с ингредиентом NEW/OLD (через индекс idx_recipe_ingredient)
+_BY_PIZZA = "pc.id_pizza = {row}.id_pizza"
+_BY_INGREDIENT = (
+    "pc.id_pizza IN "
+    "(SELECT id_pizza FROM recipe WHERE id_ingredient = {row}.id_ingredient)"
+)
+PIZZA_PRICE_TRIGGERS = [
+    (
+        "pizza_cost",
+        "INSERT",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_PIZZA.format(row="NEW"))],
+    ),
+    (
+        "pizza_cost",
+        "UPDATE",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_PIZZA.format(row="NEW"))],
+    ),
+    (
+        "pizza_cost",
+        "DELETE",
+        ["DELETE FROM pizza_price WHERE id_pizza = OLD.id_pizza;"],
+    ),
+    (
+        "recipe",
+        "INSERT",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_PIZZA.format(row="NEW"))],
+    ),
+    (
+        "recipe",
+        "UPDATE",
+        [
+            PIZZA_PRICE_REFRESH.format(filter=_BY_PIZZA.format(row="OLD")),
+            PIZZA_PRICE_REFRESH.format(
+                filter=_BY_PIZZA.format(row="NEW") + " AND NEW.id_pizza <> OLD.id_pizza"
+            ),
+        ],
+    ),
+    (
+        "recipe",
+        "DELETE",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_PIZZA.format(row="OLD"))],
+    ),
+    (
+        "ingredient_cost",
+        "INSERT",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_INGREDIENT.format(row="NEW"))],
+    ),
+    (
+        "ingredient_cost",
+        "UPDATE",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_INGREDIENT.format(row="NEW"))],
+    ),
+    (
+        "ingredient_cost",
+        "DELETE",
+        [PIZZA_PRICE_REFRESH.format(filter=_BY_INGREDIENT.format(row="OLD"))],
+    ),
+]
+
+# Миграция 3: материализованные цены пицц. Таблица заполняется по текущим данным,
+# дальше ее поддерживают триггеры на pizza_cost, recipe и ingredient_cost,
+# пересчитывая только затронутые пиццы
+MIGRATION_3 = [
+    """
+    CREATE TABLE IF NOT EXISTS pizza_price (
+        id_pizza INTEGER PRIMARY KEY,
+        price REAL NOT NULL
+    );
+    """,
+    PIZZA_PRICE_REFRESH.format(filter="true"),
+]
+MIGRATION_3 += [
+    PIZZA_PRICE_TRIGGER.format(
+        table=table, event=event, event_name=event.lower(), body="\n".join(body)
+    )
+    for table, event, body in PIZZA_PRICE_TRIGGERS
+]
+
+# Миграция 4: журнал заказов. Строки не ссылаются на pizza внешним ключом,
+# чтобы история сохранялась после удаления пицц из каталога
+MIGRATION_4 = [
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id_order INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS order_lines (
+        id_order INTEGER NOT NULL,
+        line_no INTEGER NOT NULL,
+        id_pizza INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL,
+        FOREIGN KEY (id_order) REFERENCES orders (id_order),
+        PRIMARY KEY (id_order, line_no)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_orders_created_at
+        ON orders (created_at);
+    """,
+]
+
+# Миграция 5: флаг ручного скрытия пиццы администратором. Пересчет видимости
+# по остаткам склада не трогает такие пиццы. Уже скрытые пиццы с непустым
+# рецептом, которым хватает ингредиентов, считаются скрытыми вручную
+MIGRATION_5 = [
+    """
+    ALTER TABLE pizza ADD COLUMN is_hidden BOOLEAN NOT NULL DEFAULT 0;
+    """,
+    """
+    UPDATE pizza
+    SET is_hidden = 1
+    WHERE is_visible = 0
+      AND id_pizza IN (
+          SELECT r.id_pizza
+          FROM recipe r
+          LEFT JOIN ingredient_amount ia ON ia.id_ingredient = r.id_ingredient
+          GROUP BY r.id_pizza
+          HAVING MIN(COALESCE(ia.amount, 0) >= r.amount)
+      );
+    """,
+]
+
+# Список миграций: (версия схемы после применения, запросы)
+MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, MIGRATION_1),
+    (2, MIGRATION_2),
+    (3, MIGRATION_3),
+    (4, MIGRATION_4),
+    (5, MIGRATION_5),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Получить текущую версию схемы (PRAGMA user_version).
+
+    Args:
+        conn: Соединение с базой данных
+
+    Returns:
+        Номер версии схемы
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применить к базе данных все недостающие миграции.
+
+    Каждая миграция выполняется в отдельной транзакции вместе с обновлением
+    PRAGMA user_version, поэтому прерванная миграция не оставляет схему
+    в промежуточном состоянии.
+
+    Args:
+        conn: Соединение с базой данных
+
+    Returns:
+        Версия схемы после применения миграций
+
+    Raises:
+        sqlite3.Error: При ошибке применения миграции
+    """
+    version = get_schema_version(conn)
+
+    for target, queries in MIGRATIONS:
+        if target <= version:
+            continue
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for query in queries:
+                conn.execute(query)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+
+        except sqlite3.Error as error:
+            conn.rollback()
+            raise sqlite3.Error(f"Ошибка миграции схемы до версии {target}: {error}")
+
+        version = target
+
+    return version
+
+
 def create_tables(conn: sqlite3.Connection) -> None:
     """Создает все необходимые таблицы в базе данных.
 
@@ -95,6 +374,9 @@ def create_tables(conn: sqlite3.Connection) -> None:
         conn.rollback()
         raise sqlite3.Error(f"Ошибка создания таблиц: {error}")
 
+    # Доводим свежую схему до актуальной версии
+    migrate(conn)
+
 
 def drop_tables(conn: sqlite3.Connection) -> None:
     """Удаляет все таблицы из базы данных.
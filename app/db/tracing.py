@@ -0,0 +1,471 @@
+# app/db/tracing.py
+
+"""Модуль трассировки SQL-запросов: подсчет выражений по операциям и журнал медленных запросов."""
+
+import contextlib
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, Type, TypeVar
+
+from app.core.config import (
+    DB_SLOW_QUERY_LOG,
+    DB_SLOW_QUERY_MS,
+    DB_SLOW_QUERY_PARAMS,
+    DB_SQL_TRACE,
+    DB_TRACE_MAX_STATEMENTS,
+)
+
+F = TypeVar("F", bound=Callable)
+T = TypeVar("T")
+
+# Имя, под которым учитываются выражения, выполненные вне операций
+UNTRACED_OPERATION = "(вне операций)"
+# Имя, под которым учитываются выражения сверх DB_TRACE_MAX_STATEMENTS
+OTHER_STATEMENTS = "(прочие выражения)"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Привести текст выражения к шаблону без литералов.
+
+    Трассировка получает выражения с подставленными значениями параметров,
+    поэтому для группировки литералы заменяются на "?".
+
+    Args:
+        statement: Текст выражения
+
+    Returns:
+        Шаблон выражения
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+@dataclass
+class StatementStats:
+    """Статистика одного шаблона выражения."""
+
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, count: int, seconds: float) -> None:
+        """Учесть выполнения выражения."""
+        self.count += count
+        self.seconds += seconds
+
+
+@dataclass
+class OperationStats:
+    """Статистика SQL-выражений одной операции."""
+
+    calls: int = 0
+    statements: int = 0
+    seconds: float = 0.0
+    max_statements: int = 0
+    by_statement: Dict[str, StatementStats] = field(default_factory=dict)
+
+    @property
+    def statements_per_call(self) -> float:
+        """Среднее число выражений на вызов."""
+        return self.statements / self.calls if self.calls else float(self.statements)
+
+    def __str__(self) -> str:
+        return (
+            f"вызовов {self.calls}, выражений {self.statements} "
+            f"(в среднем {self.statements_per_call:.1f}, максимум {self.max_statements}), "
+            f"время SQL {self.seconds * 1000:.1f} мс"
+        )
+
+
+class _Span:
+    """Выражения, выполненные потоком в рамках одной операции."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.depth = 1
+        self.statements: List[Tuple[str, float]] = []
+        # Текущее выражение и время SQLite, уже учтенное за ним
+        self.pending: Optional[str] = None
+        self.pending_seconds = 0.0
+        # Глубина вложенных вызовов sqlite3 и момент, с которого время
+        # вызова еще не учтено (None - поток сейчас вне вызова sqlite3)
+        self.calls = 0
+        self.mark: Optional[float] = None
+
+
+class SqlTracer:
+    """Трассировщик SQL-выражений на основе sqlite3.Connection.set_trace_callback.
+
+    Обратный вызов трассировки SQLite сообщает только о начале выражения,
+    поэтому время выражения считается по вызовам sqlite3 на соединениях
+    TracedConnection (execute, executemany, чтение строк курсора, commit,
+    rollback): за выражением учитывается только время, проведенное внутри
+    этих вызовов с его начала до начала следующего выражения или конца
+    операции. Обработка строк в Python между вызовами в длительность
+    не входит.
+
+    Выражения учитываются по операциям, отмеченным traced() или
+    trace_operation(). Выражения вне операций только подсчитываются.
+    Каждое выполнение считается отдельно: строки executemany и срабатывания
+    триггеров тоже.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = DB_SQL_TRACE,
+        slow_query_ms: float = DB_SLOW_QUERY_MS,
+        slow_query_log: Path = DB_SLOW_QUERY_LOG,
+        slow_query_params: bool = DB_SLOW_QUERY_PARAMS,
+        max_statements: int = DB_TRACE_MAX_STATEMENTS,
+    ) -> None:
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.slow_query_params = slow_query_params
+        self.max_statements = max_statements
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, OperationStats] = {}
+        self._slow_logger: Optional[logging.Logger] = None
+        self._observers: List[Callable[[str, float], None]] = []
+
+    @property
+    def active(self) -> bool:
+        """Нужно ли подключать трассировку к соединениям."""
+        return self.enabled or self.slow_query_ms > 0 or bool(self._observers)
+
+    def add_observer(self, observer: Callable[[str, float], None]) -> None:
+        """Подписаться на завершение выражений внутри операций.
+
+        Наблюдатель вызывается в потоке операции с ее именем и длительностью
+        выражения в секундах, поэтому должен работать быстро. Подписываться
+        нужно до открытия соединений: трассировка подключается к соединению
+        при его создании.
+
+        Args:
+            observer: Функция (имя операции, длительность)
+        """
+        self._observers.append(observer)
+
+    @property
+    def connection_factory(self) -> Type[sqlite3.Connection]:
+        """Класс для новых соединений (sqlite3.connect(factory=...)).
+
+        Пока трассировка выключена, используется обычное соединение без
+        накладных расходов на замер вызовов.
+        """
+        return TracedConnection if self.active else sqlite3.Connection
+
+    def install(self, conn: sqlite3.Connection) -> None:
+        """Подключить трассировку к соединению, если она включена.
+
+        Длительность выражений измеряется только на соединениях, созданных
+        с connection_factory; на остальных выражения лишь подсчитываются.
+
+        Args:
+            conn: Соединение с БД
+        """
+        if self.active:
+            conn.set_trace_callback(self._on_statement)
+            if isinstance(conn, TracedConnection):
+                conn.tracer = self
+
+    def _enter_call(self) -> None:
+        """Отметить начало вызова sqlite3 в потоке операции."""
+        span: Optional[_Span] = getattr(self._local, "span", None)
+        if span is not None:
+            span.calls += 1
+            if span.calls == 1:
+                span.mark = time.perf_counter()
+
+    def _exit_call(self) -> None:
+        """Отметить конец вызова sqlite3 и учесть его время за текущим выражением."""
+        span: Optional[_Span] = getattr(self._local, "span", None)
+        if span is None or not span.calls:
+            return
+
+        span.calls -= 1
+        if not span.calls:
+            span.pending_seconds += time.perf_counter() - span.mark
+            span.mark = None
+
+    def _on_statement(self, statement: str) -> None:
+        """Обработать начало выполнения выражения (вызывается SQLite)."""
+        span: Optional[_Span] = getattr(self._local, "span", None)
+
+        if span is None:
+            if self.enabled:
+                self._merge(UNTRACED_OPERATION, [(statement, 0.0)], calls=0)
+            return
+
+        self._finish_pending(span)
+        span.pending = statement
+
+    def _finish_pending(self, span: _Span) -> None:
+        """Завершить учет предыдущего выражения операции."""
+        if span.mark is not None:
+            now = time.perf_counter()
+            span.pending_seconds += now - span.mark
+            span.mark = now
+
+        if span.pending is None:
+            return
+
+        statement, duration = span.pending, span.pending_seconds
+        span.pending = None
+        span.pending_seconds = 0.0
+        span.statements.append((statement, duration))
+
+        for observer in self._observers:
+            observer(span.name, duration)
+
+        if 0 < self.slow_query_ms <= duration * 1000:
+            self._log_slow(span.name, statement, duration)
+
+    def _log_slow(self, operation: str, statement: str, duration: float) -> None:
+        """Записать медленное выражение в журнал.
+
+        SQLite передает выражение с подставленными значениями параметров,
+        среди которых могут быть данные клиентов и заказов, поэтому без
+        slow_query_params в журнал пишется шаблон выражения без литералов.
+        """
+        if self._slow_logger is None:
+            with self._lock:
+                if self._slow_logger is None:
+                    logger = logging.getLogger(f"{__name__}.slow")
+                    logger.propagate = False
+                    logger.setLevel(logging.WARNING)
+                    self.slow_query_log.parent.mkdir(parents=True, exist_ok=True)
+                    handler = logging.FileHandler(self.slow_query_log, encoding="utf-8")
+                    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                    logger.addHandler(handler)
+                    self._slow_logger = logger
+
+        self._slow_logger.warning(
+            "%.1f мс [%s] %s",
+            duration * 1000,
+            operation,
+            (
+                _WHITESPACE.sub(" ", statement).strip()
+                if self.slow_query_params
+                else normalize_statement(statement)
+            ),
+        )
+
+    def _merge(
+        self, name: str, statements: List[Tuple[str, float]], calls: int = 1
+    ) -> None:
+        """Добавить выражения операции в общую статистику."""
+        # Шаблоны считаются до захвата блокировки, чтобы не задерживать другие потоки
+        normalized = [
+            (normalize_statement(statement), duration)
+            for statement, duration in statements
+        ]
+
+        with self._lock:
+            stats = self._stats.setdefault(name, OperationStats())
+            stats.calls += calls
+            stats.statements += len(statements)
+            stats.max_statements = max(stats.max_statements, len(statements))
+
+            for key, duration in normalized:
+                stats.seconds += duration
+                if (
+                    key not in stats.by_statement
+                    and len(stats.by_statement) >= self.max_statements
+                ):
+                    key = OTHER_STATEMENTS
+                stats.by_statement.setdefault(key, StatementStats()).add(1, duration)
+
+    @contextlib.contextmanager
+    def trace_operation(self, name: str) -> Generator[None, None, None]:
+        """Контекстный менеджер операции, к которой относятся выражения потока.
+
+        Вложенные операции присоединяются к самой внешней. Если включены только
+        журнал медленных запросов или наблюдатели, статистика по операциям
+        не накапливается.
+
+        Args:
+            name: Имя операции
+        """
+        if not self.active:
+            yield
+            return
+
+        span: Optional[_Span] = getattr(self._local, "span", None)
+        if span is not None:
+            span.depth += 1
+            try:
+                yield
+            finally:
+                span.depth -= 1
+            return
+
+        span = _Span(name)
+        self._local.span = span
+        try:
+            yield
+        finally:
+            self._finish_pending(span)
+            self._local.span = None
+            if self.enabled:
+                self._merge(name, span.statements)
+
+    def snapshot(self) -> Dict[str, OperationStats]:
+        """Получить копию накопленной статистики по операциям."""
+        with self._lock:
+            return {
+                name: OperationStats(
+                    stats.calls,
+                    stats.statements,
+                    stats.seconds,
+                    stats.max_statements,
+                    {
+                        key: StatementStats(item.count, item.seconds)
+                        for key, item in stats.by_statement.items()
+                    },
+                )
+                for name, stats in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        """Сбросить накопленную статистику."""
+        with self._lock:
+            self._stats.clear()
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Курсор, сообщающий трассировщику соединения о времени вызовов sqlite3."""
+
+    def _timed(self, method: Callable[..., T], *args: Any) -> T:
+        """Выполнить вызов sqlite3, отметив его начало и конец в трассировщике."""
+        tracer: Optional[SqlTracer] = self.connection.tracer
+        if tracer is None:
+            return method(*args)
+
+        tracer._enter_call()
+        try:
+            return method(*args)
+        finally:
+            tracer._exit_call()
+
+    def execute(self, *args: Any) -> "TracedCursor":
+        return self._timed(super().execute, *args)
+
+    def executemany(self, *args: Any) -> "TracedCursor":
+        return self._timed(super().executemany, *args)
+
+    def executescript(self, *args: Any) -> "TracedCursor":
+        return self._timed(super().executescript, *args)
+
+    def fetchone(self) -> Any:
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args: Any) -> List[Any]:
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self) -> List[Any]:
+        return self._timed(super().fetchall)
+
+    def __next__(self) -> Any:
+        return self._timed(super().__next__)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Соединение, выражения которого трассировщик замеряет по вызовам sqlite3."""
+
+    # Трассировщик, подключенный к соединению через SqlTracer.install
+    tracer: Optional[SqlTracer] = None
+
+    def cursor(self, factory: Type[sqlite3.Cursor] = TracedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, *args: Any) -> sqlite3.Cursor:
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args: Any) -> sqlite3.Cursor:
+        return self.cursor().executescript(*args)
+
+    def commit(self) -> None:
+        if self.tracer is None:
+            return super().commit()
+
+        self.tracer._enter_call()
+        try:
+            super().commit()
+        finally:
+            self.tracer._exit_call()
+
+    def rollback(self) -> None:
+        if self.tracer is None:
+            return super().rollback()
+
+        self.tracer._enter_call()
+        try:
+            super().rollback()
+        finally:
+            self.tracer._exit_call()
+
+
+_tracer = SqlTracer()
+
+
+def get_tracer() -> SqlTracer:
+    """Получить общий трассировщик SQL приложения."""
+    return _tracer
+
+
+def traced(func: F) -> F:
+    """Декоратор операции: выражения внутри вызова учитываются под именем функции."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _tracer.active:
+            return func(*args, **kwargs)
+        with _tracer.trace_operation(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def report_sql_stats(top: int = 5) -> str:
+    """Сформировать отчет о выражениях по операциям.
+
+    Args:
+        top: Сколько самых затратных выражений показать для каждой операции
+
+    Returns:
+        Многострочный отчет
+    """
+    stats = _tracer.snapshot()
+    if not stats:
+        return "Статистика SQL пуста (трассировка включается PIZZA_DB_SQL_TRACE=1)"
+
+    lines = []
+    for name, item in sorted(stats.items(), key=lambda pair: -pair[1].seconds):
+        lines.append(f"{name}: {item}")
+        statements = sorted(
+            item.by_statement.items(),
+            key=lambda pair: (-pair[1].seconds, -pair[1].count),
+        )
+        for statement, statement_stats in statements[:top]:
+            lines.append(
+                f"  {statement_stats.count:>6} x {statement_stats.seconds * 1000:8.1f} мс  "
+                f"{statement[:120]}"
+            )
+
+    return "\n".join(lines)
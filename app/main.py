@@ -3,8 +3,15 @@
 """Главный модуль приложения."""
 
 import os
-
-from app.core.config import DB_PATH, DATA_DIR
+import sqlite3
+from pathlib import Path
+
+from app.core.config import DB_PATH, DATA_DIR, METRICS_DUMP, METRICS_HOST, METRICS_PORT
+from app.core.metrics import dump_metrics, setup_app_metrics, start_metrics_server
+from app.db.connection import get_connection, report_connection_settings
+from app.db.journal import get_order_journal
+from app.db.schema import migrate
+from app.db.tracing import get_tracer, report_sql_stats
 from app.ui.main_menu import show_main_menu
 
 
@@ -35,9 +42,25 @@ def initialize_database() -> None:
         raise
 
 
+def setup_metrics() -> None:
+    """Включить сбор метрик и запустить HTTP-эндпоинт, если они настроены."""
+    if not METRICS_PORT and not METRICS_DUMP:
+        return
+
+    # Длительность SQL-выражений приходит от трассировщика
+    setup_app_metrics()
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_HOST, METRICS_PORT)
+        print(f"Метрики: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+
 def main() -> None:
     """Точка входа в приложение."""
     try:
+        # Метрики настраиваются до открытия соединений с БД
+        setup_metrics()
+
         # Проверяем наличие базы данных
         if not check_database():
             print("База данных не найдена")
@@ -49,6 +72,13 @@ def main() -> None:
                 print("Невозможно продолжить без базы данных")
                 return
 
+        # Доводим схему базы данных до актуальной версии
+        with get_connection() as conn:
+            migrate(conn)
+
+        # Выводим фактические параметры соединения с БД
+        print(f"Параметры БД: {report_connection_settings()}")
+
         # Запускаем главное меню
         show_main_menu()
 
@@ -57,6 +87,20 @@ def main() -> None:
     except Exception as error:
         print(f"\nПроизошла непредвиденная ошибка: {error}")
     finally:
+        # Дописываем журнал заказов до выхода
+        get_order_journal().close()
+
+        # Выводим статистику SQL по операциям, если трассировка включена
+        if get_tracer().enabled:
+            print(f"\nСтатистика SQL:\n{report_sql_stats()}")
+
+        # Сохраняем метрики в файл, если он задан
+        if METRICS_DUMP:
+            try:
+                dump_metrics(Path(METRICS_DUMP))
+            except (OSError, sqlite3.Error) as error:
+                print(f"Не удалось сохранить метрики: {error}")
+
         print("\nДо свидания!")
 
 
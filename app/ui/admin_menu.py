@@ -24,6 +24,12 @@ def show_admin_menu() -> None:
         print("10. Изменить рецепт")
         print("11. Удалить рецепт")
 
+        print("\nОтчеты:")
+        print("12. Сколько пицц можно приготовить")
+
+        print("\nПакетные операции:")
+        print("13. Пополнить запасы из файла поставки (CSV/JSONL)")
+
         print("\n0. Вернуться в главное меню")
 
         choice = input("\nВыберите действие: ")
@@ -51,6 +57,10 @@ def show_admin_menu() -> None:
                 modify_recipe()
             case "11":
                 remove_recipe()
+            case "12":
+                show_capacity_report()
+            case "13":
+                restock_from_manifest()
             case "0":
                 break
             case _:
@@ -403,3 +413,54 @@ def remove_recipe() -> None:
         print(f"\nОшибка: {error}")
     except sqlite3.Error as error:
         print(f"\nОшибка: {error}")
+
+
+# ======================== Пакетные операции ========================
+
+
+def print_batch_result(result: BatchResult) -> None:
+    """Показать итог пакетной операции и ошибки по строкам."""
+    print(f"\n{result}")
+    for error in result.errors:
+        print(f"- {error}")
+
+
+def restock_from_manifest() -> None:
+    """Пополнить запасы ингредиентов из файла поставки."""
+    try:
+        print("\n=== Пополнение запасов из файла ===")
+
+        path = input("Введите путь к файлу (CSV или JSONL): ").strip()
+        if not path:
+            print("Путь не может быть пустым")
+            return
+
+        print_batch_result(restock_from_file(Path(path)))
+
+    except ValueError as error:
+        print(f"\nОшибка: {error}")
+    except OSError as error:
+        print(f"\nОшибка чтения файла: {error}")
+    except sqlite3.Error as error:
+        print(f"\nОшибка: {error}")
+
+
+# ======================== Отчеты ========================
+
+
+def show_capacity_report() -> None:
+    """Показать, сколько каждой пиццы можно приготовить из текущих остатков."""
+    try:
+        report = get_capacity_report()
+        if not report:
+            print("\nСписок пицц пуст")
+            return
+
+        print("\nВозможное количество пицц:")
+        for pizza, capacity in report:
+            status = "видима" if pizza.is_visible else "скрыта"
+            amount = "без ограничений" if capacity is None else f"{capacity} шт."
+            print(f"{pizza.id_pizza}. {pizza.name_pizza}: {amount} ({status})")
+
+    except sqlite3.Error as error:
+        print(f"\nОшибка: {error}")
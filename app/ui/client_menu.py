@@ -10,6 +10,7 @@ def show_client_menu() -> None:
         print("1. Посмотреть доступные пиццы")
         print("2. Посмотреть детали пиццы")
         print("3. Заказать пиццу")
+        print("4. Заказать несколько пицц")
         print("0. Вернуться в главное меню")
 
         choice = input("\nВыберите действие: ")
@@ -21,6 +22,8 @@ def show_client_menu() -> None:
                 show_pizza_details()
             case "3":
                 make_order()
+            case "4":
+                make_bulk_order()
             case "0":
                 break
             case _:
@@ -75,3 +78,31 @@ def make_order() -> None:
         print(f"\nОшибка: {error}")
     except sqlite3.Error as error:
         print(f"\nОшибка: {error}")
+
+
+def make_bulk_order() -> None:
+    """Оформить заказ из нескольких пицц."""
+    try:
+        items = []
+        while True:
+            try:
+                pizza_id = int(input("\nВведите номер пиццы (0 для завершения): "))
+                if pizza_id == 0:
+                    break
+
+                quantity = int(input("Введите количество: "))
+                items.append((pizza_id, quantity))
+
+            except ValueError:
+                print("Некорректный ввод, попробуйте снова")
+
+        if not items:
+            print("Заказ не может быть пустым")
+            return
+
+        print("\nРезультат заказа:")
+        for result in order_pizzas(items):
+            print(f"- {result}")
+
+    except sqlite3.Error as error:
+        print(f"\nОшибка: {error}")
@@ -0,0 +1,140 @@
+# benchmarks/cases.py
+
+"""Модуль, содержащий случаи замеров клиентских и административных операций."""
+
+import random
+from typing import List, Tuple
+
+from app.admin.operations import (
+    add_ingredient,
+    add_pizza,
+    add_recipe,
+    delete_ingredient,
+    refill_all_ingredients,
+    update_recipe,
+)
+from app.client.cache import get_menu_cache
+from app.client.operations import get_available_pizzas, get_pizza_details, order_pizza
+from app.db.connection import get_connection
+from app.db.queries import update_pizzas_visibility_by_ingredients
+from benchmarks.harness import BenchmarkCase
+
+SQL_SELECT_VISIBLE_PIZZA_IDS = "SELECT id_pizza FROM pizza WHERE is_visible = 1"
+SQL_SELECT_PIZZA_IDS = "SELECT id_pizza FROM pizza"
+SQL_SELECT_INGREDIENT_IDS = "SELECT id_ingredient FROM ingredient"
+
+# Пополнение перед замером заказов, чтобы пиццы не заканчивались
+ORDER_STOCK_REFILL = 1_000_000
+# Число пицц, удаляемых вместе с ингредиентом в замере delete_ingredient
+PIZZAS_PER_DELETED_INGREDIENT = 5
+# Число популярных пицц, состав которых запрашивается повторно (попадания в кэш)
+HOT_PIZZAS = 10
+
+
+def update_visibility_all() -> int:
+    """Полный пересчет видимости всех пицц."""
+    with get_connection() as conn:
+        return update_pizzas_visibility_by_ingredients(conn=conn)
+
+
+def update_visibility_one(ingredient_id: int) -> int:
+    """Пересчет видимости пицц, использующих один ингредиент."""
+    with get_connection() as conn:
+        return update_pizzas_visibility_by_ingredients([ingredient_id], conn)
+
+
+def build_cases(seed: int = 42) -> List[BenchmarkCase]:
+    """Собрать случаи замеров для текущей базы данных.
+
+    Случаи, читающие меню, сбрасывают кэш перед каждым вызовом, чтобы
+    замерялся путь до БД. Случаи, меняющие каталог, создают себе данные в
+    подготовке и не трогают сгенерированные пиццы без необходимости.
+
+    Args:
+        seed: Зерно генератора случайных аргументов
+
+    Returns:
+        Список случаев в порядке выполнения
+    """
+    rng = random.Random(seed)
+
+    with get_connection() as conn:
+        visible_ids = [row[0] for row in conn.execute(SQL_SELECT_VISIBLE_PIZZA_IDS)]
+        pizza_ids = [row[0] for row in conn.execute(SQL_SELECT_PIZZA_IDS)]
+        ingredient_ids = [row[0] for row in conn.execute(SQL_SELECT_INGREDIENT_IDS)]
+
+    def random_recipe() -> List[Tuple[int, int]]:
+        size = min(len(ingredient_ids), rng.randint(3, 8))
+        return [
+            (ingredient_id, rng.randint(1, 3))
+            for ingredient_id in rng.sample(ingredient_ids, size)
+        ]
+
+    def cold_menu() -> tuple:
+        get_menu_cache().clear()
+        return ()
+
+    def cold_details() -> tuple:
+        get_menu_cache().clear()
+        return (rng.choice(visible_ids),)
+
+    def warm_details() -> tuple:
+        return (rng.choice(visible_ids[:HOT_PIZZAS]),)
+
+    def order_args() -> tuple:
+        return (rng.choice(visible_ids),)
+
+    def new_pizza() -> tuple:
+        return add_pizza("Замер", rng.uniform(1.0, 2.0)), random_recipe()
+
+    def existing_pizza() -> tuple:
+        return rng.choice(pizza_ids), random_recipe()
+
+    def ingredient_with_pizzas() -> tuple:
+        ingredient_id = add_ingredient("Замер", 1.0, 10)
+        for _ in range(PIZZAS_PER_DELETED_INGREDIENT):
+            pizza_id = add_pizza("Замер", 1.0)
+            add_recipe(pizza_id, random_recipe() + [(ingredient_id, 1)])
+        return ingredient_id, True
+
+    def popular_ingredient() -> tuple:
+        return (ingredient_ids[0],)
+
+    cases = [
+        BenchmarkCase("get_available_pizzas", get_available_pizzas, cold_menu),
+        BenchmarkCase("get_available_pizzas[cached]", get_available_pizzas),
+        BenchmarkCase("get_pizza_details", get_pizza_details, cold_details),
+        BenchmarkCase("get_pizza_details[cached]", get_pizza_details, warm_details),
+        BenchmarkCase("add_recipe", add_recipe, new_pizza),
+        BenchmarkCase("update_recipe", update_recipe, existing_pizza),
+        BenchmarkCase(
+            "delete_ingredient(force=True)",
+            delete_ingredient,
+            ingredient_with_pizzas,
+            heavy=True,
+        ),
+        BenchmarkCase(
+            "update_pizzas_visibility_by_ingredients[one]",
+            update_visibility_one,
+            popular_ingredient,
+        ),
+        BenchmarkCase(
+            "update_pizzas_visibility_by_ingredients[all]",
+            update_visibility_all,
+            heavy=True,
+        ),
+        BenchmarkCase(
+            "refill_all_ingredients",
+            refill_all_ingredients,
+            lambda: (ORDER_STOCK_REFILL,),
+            heavy=True,
+        ),
+        BenchmarkCase("order_pizza", order_pizza, order_args),
+    ]
+
+    if not visible_ids:
+        # Без видимых пицц чтение состава и заказы замерять не на чем
+        skipped = {"get_pizza_details", "get_pizza_details[cached]", "order_pizza"}
+        cases = [case for case in cases if case.name not in skipped]
+
+    return cases
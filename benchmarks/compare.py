@@ -0,0 +1,66 @@
+# benchmarks/compare.py
+
+"""Скрипт сравнения двух файлов результатов замеров.
+
+Пример:
+    python -m benchmarks.compare data/bench-old.json data/bench.json --threshold 1.2
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+# Метрики, по которым ищутся регрессии (чем больше, тем хуже)
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "queries_per_op")
+
+
+def load_results(path: Path) -> Dict[Tuple[str, int, int], Dict[str, Any]]:
+    """Загрузить результаты замеров с ключом (операция, пиццы, ингредиенты)."""
+    report = json.loads(path.read_text("utf-8"))
+    return {
+        (item["operation"], item["pizzas"], item["ingredients"]): item
+        for item in report["results"]
+    }
+
+
+def main() -> None:
+    """Сравнить результаты и завершиться с кодом 1 при регрессии."""
+    parser = argparse.ArgumentParser(description="Сравнение результатов замеров")
+    parser.add_argument("baseline", type=Path, help="Результаты до изменений")
+    parser.add_argument("current", type=Path, help="Результаты после изменений")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Во сколько раз метрика может вырасти без регрессии",
+    )
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    regressions = 0
+
+    for key in sorted(
+        baseline.keys() & current.keys(), key=lambda k: (k[1], k[2], k[0])
+    ):
+        operation, pizzas, ingredients = key
+        changes = []
+        for metric in COMPARED_METRICS:
+            before, after = baseline[key][metric], current[key][metric]
+            ratio = after / before if before else (1.0 if not after else float("inf"))
+            marker = ""
+            if ratio > args.threshold:
+                marker = " !"
+                regressions += 1
+            changes.append(f"{metric}={before:.3f}->{after:.3f} (x{ratio:.2f}){marker}")
+
+        print(f"{pizzas}:{ingredients} {operation}: " + ", ".join(changes))
+
+    print(f"\nРегрессий: {regressions}")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/harness.py
+
+"""Модуль, содержащий инфраструктуру замеров: перцентили и прогон случаев."""
+
+import math
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.client.cache import get_menu_cache
+from app.db.connection import get_pool, get_read_pool
+from app.db.tracing import get_tracer
+
+
+def use_database(db_path: Path) -> None:
+    """Переключить пулы соединений на базу для замеров и включить трассировку SQL.
+
+    Args:
+        db_path: Путь к файлу базы данных
+    """
+    get_tracer().enabled = True
+
+    for pool in (get_pool(), get_read_pool()):
+        pool.close_all()
+        pool.db_path = db_path
+    get_menu_cache().clear()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Вычислить перцентиль с линейной интерполяцией.
+
+    Args:
+        samples: Отсортированные значения
+        fraction: Доля от 0 до 1 (0.95 для p95)
+
+    Returns:
+        Значение перцентиля
+    """
+    if not samples:
+        return 0.0
+
+    position = (len(samples) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+
+@dataclass
+class BenchmarkCase:
+    """Случай замера: операция и подготовка перед каждым ее вызовом.
+
+    setup выполняется вне замера и возвращает аргументы для operation.
+    """
+
+    name: str
+    operation: Callable[..., Any]
+    setup: Optional[Callable[[], tuple]] = None
+    heavy: bool = False
+
+
+@dataclass
+class BenchmarkResult:
+    """Результат замера одного случая на одном каталоге."""
+
+    operation: str
+    pizzas: int
+    ingredients: int
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    ops_per_sec: float
+    queries_per_op: float
+    errors: int = 0
+    error_samples: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Получить результат в виде словаря для JSON."""
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.operation:<46} n={self.iterations:<5} "
+            f"p50={self.p50_ms:9.3f} мс  p95={self.p95_ms:9.3f} мс  "
+            f"p99={self.p99_ms:9.3f} мс  {self.ops_per_sec:10.1f} оп/с  "
+            f"запросов={self.queries_per_op:6.1f}"
+            + (f"  ошибок={self.errors}" if self.errors else "")
+        )
+
+
+def run_case(
+    case: BenchmarkCase,
+    iterations: int,
+    pizzas: int,
+    ingredients: int,
+) -> BenchmarkResult:
+    """Выполнить замер одного случая.
+
+    Время и число SQL-выражений учитываются только для самой операции,
+    подготовка (setup) в замер не входит. Выражения считает трассировщик SQL
+    (см. app.db.tracing). Исключения операции считаются ошибками и не
+    прерывают замер.
+
+    Args:
+        case: Случай замера
+        iterations: Число вызовов операции
+        pizzas: Размер каталога (пиццы) для отчета
+        ingredients: Размер каталога (ингредиенты) для отчета
+
+    Returns:
+        Результат замера
+    """
+    tracer = get_tracer()
+    tracer.reset()
+    durations = []
+    errors = []
+
+    for _ in range(iterations):
+        args = case.setup() if case.setup is not None else ()
+
+        with tracer.trace_operation(case.name):
+            started = time.perf_counter()
+            try:
+                case.operation(*args)
+            except (ValueError, sqlite3.Error) as error:
+                errors.append(str(error))
+            durations.append(time.perf_counter() - started)
+
+    stats = tracer.snapshot().get(case.name)
+    durations.sort()
+    total = sum(durations)
+
+    return BenchmarkResult(
+        operation=case.name,
+        pizzas=pizzas,
+        ingredients=ingredients,
+        iterations=iterations,
+        p50_ms=percentile(durations, 0.50) * 1000,
+        p95_ms=percentile(durations, 0.95) * 1000,
+        p99_ms=percentile(durations, 0.99) * 1000,
+        mean_ms=total / iterations * 1000,
+        ops_per_sec=iterations / total if total > 0 else 0.0,
+        queries_per_op=stats.statements / iterations if stats else 0.0,
+        errors=len(errors),
+        error_samples=errors[:3],
+    )
@@ -0,0 +1,128 @@
+# benchmarks/run.py
+
+"""Скрипт замеров производительности операций на синтетических каталогах.
+
+Для каждого размера каталога база пересоздается генератором из
+scripts/generate_catalog.py, после чего замеряются все случаи из
+benchmarks/cases.py. Результаты выводятся на экран и сохраняются в JSON.
+
+Примеры:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000:100,100000:10000 --output data/bench.json
+    python -m benchmarks.compare data/bench-old.json data/bench.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from app.core.config import DATA_DIR
+from app.db.connection import get_connection
+from app.db.journal import get_order_journal
+from app.db.schema import create_tables, drop_tables
+from benchmarks.cases import build_cases
+from benchmarks.harness import run_case, use_database
+from scripts.generate_catalog import CatalogGenerator, generate_catalog
+
+DEFAULT_SIZES = "1000:100,10000:500,100000:2000"
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    """Разобрать список размеров каталога вида "1000:100,10000:500".
+
+    Args:
+        value: Пары пиццы:ингредиенты через запятую
+
+    Returns:
+        Список кортежей (число пицц, число ингредиентов)
+
+    Raises:
+        argparse.ArgumentTypeError: Если формат некорректен
+    """
+    sizes = []
+    for item in value.split(","):
+        try:
+            pizzas, ingredients = (int(part) for part in item.split(":"))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Некорректный размер каталога: {item}")
+        sizes.append((pizzas, ingredients))
+    return sizes
+
+
+def main() -> None:
+    """Прогнать замеры на каталогах всех размеров и сохранить результаты."""
+    parser = argparse.ArgumentParser(description="Замеры производительности операций")
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=parse_sizes(DEFAULT_SIZES),
+        help=f"Размеры каталогов пиццы:ингредиенты (по умолчанию {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="Число вызовов легких операций"
+    )
+    parser.add_argument(
+        "--heavy-iterations",
+        type=int,
+        default=10,
+        help="Число вызовов тяжелых операций (полные пересчеты и удаления)",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+    parser.add_argument(
+        "--db", type=Path, default=DATA_DIR / "bench.db", help="Файл базы для замеров"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DATA_DIR / "bench.json",
+        help="Файл для результатов в формате JSON",
+    )
+    args = parser.parse_args()
+
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    use_database(args.db)
+
+    results = []
+    for pizzas, ingredients in args.sizes:
+        print(f"\n=== Каталог: {pizzas} пицц, {ingredients} ингредиентов ===")
+
+        # Журнал заказов предыдущего каталога должен быть записан до пересоздания
+        get_order_journal().flush()
+
+        generator = CatalogGenerator(pizzas, ingredients, seed=args.seed)
+        with get_connection() as conn:
+            drop_tables(conn)
+            create_tables(conn)
+            generate_catalog(conn, generator)
+            conn.execute("ANALYZE")
+
+        for case in build_cases(args.seed):
+            iterations = args.heavy_iterations if case.heavy else args.iterations
+            result = run_case(case, iterations, pizzas, ingredients)
+            results.append(result)
+            print(result)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "heavy_iterations": args.heavy_iterations,
+        },
+        "results": [result.to_dict() for result in results],
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), "utf-8")
+    print(f"\nРезультаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
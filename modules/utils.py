@@ -1,3 +1,163 @@
 # modules/utils.py
 
 """Модуль, содержащий вспомогательные функции и утилиты, используемые в разных частях приложения."""
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+# Поддерживаемые форматы файлов с записями
+CSV_SUFFIXES = (".csv",)
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+
+def detect_format(path: Path) -> str:
+    """Определить формат файла с записями по расширению.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        "csv" или "jsonl"
+
+    Raises:
+        ValueError: Если расширение не поддерживается
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in CSV_SUFFIXES:
+        return "csv"
+    if suffix in JSONL_SUFFIXES:
+        return "jsonl"
+    raise ValueError(f"Неподдерживаемый формат файла: {path}")
+
+
+def iter_records(path: Path) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Построчно читать записи из CSV (с заголовком) или JSONL файла.
+
+    Файл не загружается в память целиком. Пустые строки пропускаются,
+    для строк, которые не удалось разобрать (в том числе с некорректной
+    кодировкой UTF-8), вместо записи возвращается None.
+
+    Args:
+        path: Путь к файлу
+
+    Yields:
+        Кортежи (номер строки в файле, запись или None)
+
+    Raises:
+        ValueError: Если формат файла не поддерживается
+        OSError: При ошибке чтения файла
+    """
+    file_format = detect_format(path)
+
+    # Некорректные байты не прерывают чтение: они сохраняются суррогатами,
+    # а строка с ними возвращается как неразобранная
+    with open(path, encoding="utf-8", errors="surrogateescape", newline="") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                if not any(record.values()):
+                    continue
+                valid = is_valid_text(
+                    value for value in record.values() if isinstance(value, str)
+                )
+                yield reader.line_num, record if valid else None
+            return
+
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            if not is_valid_text([line]):
+                yield line_number, None
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line_number, None
+                continue
+            yield line_number, record if isinstance(record, dict) else None
+
+
+def is_valid_text(values: Iterable[str]) -> bool:
+    """Проверить, что строки прочитаны из файла без ошибок декодирования UTF-8.
+
+    Args:
+        values: Строки, прочитанные с errors="surrogateescape"
+
+    Returns:
+        True если ни одна строка не содержит некорректных байтов
+    """
+    try:
+        for value in values:
+            value.encode("utf-8")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def write_records(
+    path: Path, columns: Sequence[str], rows: Iterable[Sequence[Any]]
+) -> int:
+    """Построчно записать записи в CSV (с заголовком) или JSONL файл.
+
+    Строки берутся из потока и сразу пишутся в файл, не накапливаясь в памяти.
+
+    Args:
+        path: Путь к файлу
+        columns: Имена колонок
+        rows: Поток строк со значениями в порядке колонок
+
+    Returns:
+        Количество записанных строк
+
+    Raises:
+        ValueError: Если формат файла не поддерживается
+        OSError: При ошибке записи файла
+    """
+    file_format = detect_format(path)
+    count = 0
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            return count
+
+        for row in rows:
+            file.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            file.write("\n")
+            count += 1
+
+    return count
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Разбить поток на списки не длиннее size элементов.
+
+    Args:
+        iterable: Исходный поток
+        size: Размер порции
+
+    Yields:
+        Очередная порция элементов
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,51 @@
+# scripts/catalog.py
+
+"""Скрипт для потокового импорта и экспорта каталога пиццерии (CSV и JSONL).
+
+Примеры:
+    python -m scripts.catalog export data/export --format jsonl
+    python -m scripts.catalog import data/export --format jsonl
+"""
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+from app.admin.catalog import export_catalog, import_catalog
+
+
+def main() -> None:
+    """Разобрать аргументы командной строки и выполнить импорт или экспорт."""
+    parser = argparse.ArgumentParser(description="Импорт и экспорт каталога пиццерии")
+    parser.add_argument("command", choices=("export", "import"), help="Операция")
+    parser.add_argument("directory", type=Path, help="Каталог с файлами таблиц")
+    parser.add_argument(
+        "--format", choices=("csv", "jsonl"), default="csv", help="Формат файлов"
+    )
+    parser.add_argument(
+        "--keep-ids",
+        action="store_true",
+        help="Сохранить ID из файлов (по умолчанию ID сдвигаются за существующие)",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            counts = export_catalog(args.directory, args.format)
+            for table, count in counts.items():
+                print(f"{table}: выгружено строк {count}")
+            return
+
+        results = import_catalog(args.directory, args.format, not args.keep_ids)
+        for table, result in results.items():
+            print(f"{table}: {result}")
+            for error in result.errors:
+                print(f"  - {error}")
+
+    except (ValueError, OSError, sqlite3.Error) as error:
+        print(f"Ошибка: {error}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
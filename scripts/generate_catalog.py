@@ -0,0 +1,233 @@
+# scripts/generate_catalog.py
+
+"""Скрипт для генерации большого синтетического каталога для нагрузочного тестирования.
+
+Скрипт пересоздает все таблицы базы, поэтому по умолчанию пишет в отдельную
+базу data/bench.db. Рабочая база приложения (DB_PATH) перезаписывается
+только с флагом --force.
+
+Примеры:
+    python -m scripts.generate_catalog --pizzas 100000 --ingredients 500
+    python -m scripts.generate_catalog --pizzas 1000 --db /tmp/catalog.db
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from app.core.config import BATCH_CHUNK_SIZE, DATA_DIR, DB_PATH
+from app.db.connection import get_connection, get_pool, get_read_pool, unit_of_work
+from app.db.queries import update_pizzas_visibility_by_ingredients
+from app.db.schema import create_tables, drop_tables
+from modules.utils import chunked
+
+SQL_INSERT_PIZZA = (
+    "INSERT INTO pizza (id_pizza, name_pizza, is_visible) VALUES (?, ?, 1)"
+)
+SQL_INSERT_PIZZA_COST = "INSERT INTO pizza_cost (id_pizza, cost_factor) VALUES (?, ?)"
+SQL_INSERT_INGREDIENT = (
+    "INSERT INTO ingredient (id_ingredient, name_ingredient) VALUES (?, ?)"
+)
+SQL_INSERT_INGREDIENT_COST = (
+    "INSERT INTO ingredient_cost (id_ingredient, cost) VALUES (?, ?)"
+)
+SQL_INSERT_INGREDIENT_AMOUNT = (
+    "INSERT INTO ingredient_amount (id_ingredient, amount) VALUES (?, ?)"
+)
+SQL_INSERT_RECIPE = (
+    "INSERT INTO recipe (id_pizza, id_ingredient, amount) VALUES (?, ?, ?)"
+)
+
+
+class CatalogGenerator:
+    """Детерминированный генератор синтетического каталога.
+
+    Популярность ингредиентов распределена по закону Ципфа (несколько базовых
+    ингредиентов вроде теста и сыра входят почти во все рецепты, остальные
+    встречаются редко), размер рецепта — нормальное распределение вокруг
+    recipe_mean, стоимость ингредиентов — логнормальное.
+    """
+
+    def __init__(
+        self,
+        pizzas: int,
+        ingredients: int,
+        seed: int = 42,
+        recipe_mean: float = 6.0,
+        recipe_max: int = 15,
+        zipf_exponent: float = 1.1,
+        max_stock: int = 10_000,
+        empty_stock_share: float = 0.02,
+    ) -> None:
+        if pizzas < 0 or ingredients < 1:
+            raise ValueError(
+                "Нужно хотя бы один ингредиент и неотрицательное число пицц"
+            )
+
+        self.pizzas = pizzas
+        self.ingredients = ingredients
+        self.recipe_mean = recipe_mean
+        self.recipe_max = min(recipe_max, ingredients)
+        self.max_stock = max_stock
+        self.empty_stock_share = empty_stock_share
+
+        self._random = random.Random(seed)
+        self._cum_weights = list(
+            accumulate(1.0 / rank**zipf_exponent for rank in range(1, ingredients + 1))
+        )
+
+    def _pick_ingredient(self) -> int:
+        """Выбрать ID ингредиента с учетом популярности."""
+        point = self._random.random() * self._cum_weights[-1]
+        return bisect_left(self._cum_weights, point) + 1
+
+    def _recipe_size(self) -> int:
+        """Выбрать число ингредиентов в рецепте."""
+        size = round(self._random.gauss(self.recipe_mean, self.recipe_mean / 3))
+        return max(1, min(self.recipe_max, size))
+
+    def ingredient_rows(self) -> Iterator[Tuple[int, str]]:
+        """Строки таблицы ingredient."""
+        for ingredient_id in range(1, self.ingredients + 1):
+            yield ingredient_id, f"Ингредиент {ingredient_id}"
+
+    def ingredient_cost_rows(self) -> Iterator[Tuple[int, float]]:
+        """Строки таблицы ingredient_cost."""
+        for ingredient_id in range(1, self.ingredients + 1):
+            yield ingredient_id, round(self._random.lognormvariate(-0.5, 0.6), 2)
+
+    def ingredient_amount_rows(self) -> Iterator[Tuple[int, int]]:
+        """Строки таблицы ingredient_amount (часть ингредиентов закончилась)."""
+        for ingredient_id in range(1, self.ingredients + 1):
+            if self._random.random() < self.empty_stock_share:
+                yield ingredient_id, 0
+            else:
+                yield ingredient_id, self._random.randint(1, self.max_stock)
+
+    def pizza_rows(self) -> Iterator[Tuple[int, str]]:
+        """Строки таблицы pizza."""
+        for pizza_id in range(1, self.pizzas + 1):
+            yield pizza_id, f"Пицца {pizza_id}"
+
+    def pizza_cost_rows(self) -> Iterator[Tuple[int, float]]:
+        """Строки таблицы pizza_cost."""
+        for pizza_id in range(1, self.pizzas + 1):
+            yield pizza_id, round(self._random.uniform(1.0, 2.0), 2)
+
+    def recipe_rows(self) -> Iterator[Tuple[int, int, int]]:
+        """Строки таблицы recipe."""
+        for pizza_id in range(1, self.pizzas + 1):
+            size = self._recipe_size()
+            chosen: Dict[int, int] = {}
+            while len(chosen) < size:
+                chosen.setdefault(self._pick_ingredient(), self._random.randint(1, 3))
+            for ingredient_id, amount in chosen.items():
+                yield pizza_id, ingredient_id, amount
+
+
+def generate_catalog(
+    conn: sqlite3.Connection, generator: CatalogGenerator
+) -> Dict[str, int]:
+    """Заполнить пустую схему синтетическим каталогом в одной транзакции.
+
+    Args:
+        conn: Соединение с БД
+        generator: Генератор данных
+
+    Returns:
+        Количество вставленных строк по таблицам
+
+    Raises:
+        sqlite3.Error: При ошибке работы с БД
+    """
+    steps: List[Tuple[str, str, Iterator[Tuple]]] = [
+        ("ingredient", SQL_INSERT_INGREDIENT, generator.ingredient_rows()),
+        (
+            "ingredient_cost",
+            SQL_INSERT_INGREDIENT_COST,
+            generator.ingredient_cost_rows(),
+        ),
+        (
+            "ingredient_amount",
+            SQL_INSERT_INGREDIENT_AMOUNT,
+            generator.ingredient_amount_rows(),
+        ),
+        ("pizza", SQL_INSERT_PIZZA, generator.pizza_rows()),
+        ("pizza_cost", SQL_INSERT_PIZZA_COST, generator.pizza_cost_rows()),
+        ("recipe", SQL_INSERT_RECIPE, generator.recipe_rows()),
+    ]
+    counts = {}
+
+    with unit_of_work(conn):
+        for table, query, rows in steps:
+            counts[table] = 0
+            for chunk in chunked(rows, BATCH_CHUNK_SIZE):
+                conn.executemany(query, chunk)
+                counts[table] += len(chunk)
+
+        update_pizzas_visibility_by_ingredients(conn=conn)
+
+    return counts
+
+
+def main() -> None:
+    """Пересоздать базу данных и заполнить ее синтетическим каталогом."""
+    parser = argparse.ArgumentParser(description="Генерация синтетического каталога")
+    parser.add_argument("--pizzas", type=int, default=10_000, help="Число пицц")
+    parser.add_argument(
+        "--ingredients", type=int, default=500, help="Число ингредиентов"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+    parser.add_argument(
+        "--recipe-mean", type=float, default=6.0, help="Средний размер рецепта"
+    )
+    parser.add_argument(
+        "--recipe-max", type=int, default=15, help="Максимальный размер рецепта"
+    )
+    parser.add_argument(
+        "--db", type=Path, default=DATA_DIR / "bench.db", help="Файл базы для каталога"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Разрешить перезапись рабочей базы приложения",
+    )
+    args = parser.parse_args()
+
+    if args.db.resolve() == DB_PATH.resolve() and not args.force:
+        parser.error(
+            f"{args.db} - рабочая база приложения, все ее таблицы будут пересозданы; "
+            "для подтверждения укажите --force"
+        )
+
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    for pool in (get_pool(), get_read_pool()):
+        pool.close_all()
+        pool.db_path = args.db
+
+    generator = CatalogGenerator(
+        args.pizzas,
+        args.ingredients,
+        seed=args.seed,
+        recipe_mean=args.recipe_mean,
+        recipe_max=args.recipe_max,
+    )
+
+    started = time.perf_counter()
+    with get_connection() as conn:
+        drop_tables(conn)
+        create_tables(conn)
+        counts = generate_catalog(conn, generator)
+
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"Готово за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 
 """Скрипт для создания и инициализации базы данных SQLite."""
 
-from app.db.connection import get_connection
+from app.db.connection import get_connection, unit_of_work
 from app.db.queries import *
 from app.db.schema import create_tables, drop_tables
 
@@ -67,7 +67,8 @@ def setup() -> None:
             create_tables(conn)
 
             print("Загрузка начальных данных...")
-            seed_initial_data(conn)
+            with unit_of_work(conn):
+                seed_initial_data(conn)
 
         print("База данных успешно инициализирована!")
     except Exception as error: